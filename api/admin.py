@@ -1,5 +1,6 @@
 from django.contrib import admin
 from . import models
+from . import moderation
 
 
 # Register your models here.
@@ -54,6 +55,18 @@ class Product(admin.ModelAdmin):
     list_display_links = ("name",)
 
 
+@admin.register(models.ProductStats)
+class ProductStats(admin.ModelAdmin):
+    list_display = (
+        "product",
+        "sold_units",
+        "order_lines",
+        "review_count",
+        "rating_avg",
+    )
+    list_display_links = ("product",)
+
+
 @admin.register(models.ProductSpecification)
 class ProductSpecification(admin.ModelAdmin):
     list_display = ("id", "key", "value", "product")
@@ -66,10 +79,39 @@ class ProductImage(admin.ModelAdmin):
     list_display_links = ("product",)
 
 
+class ModerationQueueFilter(admin.SimpleListFilter):
+    title = "moderation"
+    parameter_name = "moderation"
+
+    def lookups(self, request, model_admin):
+        return (("queue", "Reported"),)
+
+    def queryset(self, request, queryset):
+        if self.value() == "queue":
+            return queryset.filter(reports_count__gt=0)
+
+        return queryset
+
+
 @admin.register(models.Review)
 class Review(admin.ModelAdmin):
-    list_display = ("id", "product", "customer", "rating")
+    list_display = ("id", "product", "customer", "rating", "reports_count", "hidden")
     list_display_links = ("product",)
+    list_filter = (ModerationQueueFilter, "hidden")
+    # The most reported reviews first, backed by a partial index
+    ordering = ("-reports_count", "-id")
+    list_select_related = ("product", "customer__user")
+    actions = ("approve_reviews", "hide_reviews")
+
+    @admin.action(description="Approve selected reviews")
+    def approve_reviews(self, request, queryset):
+        updated = moderation.set_hidden(queryset, False)
+        self.message_user(request, f"{updated} reviews approved.")
+
+    @admin.action(description="Hide selected reviews")
+    def hide_reviews(self, request, queryset):
+        updated = moderation.set_hidden(queryset, True)
+        self.message_user(request, f"{updated} reviews hidden.")
 
 
 @admin.register(models.ReviewLike)
@@ -0,0 +1,126 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from . import models
+
+SUGGESTIONS_LIMIT = 10
+MAX_PREFIX_LENGTH = 64
+
+# Catalog changes bump this version so every process rebuilds its index, the
+# maximum age picks up changes in sales that do not bump it
+INDEX_VERSION_KEY = "autocomplete:version"
+INDEX_MAX_AGE = 60 * 60
+
+
+class SuggestionTrie:
+    """
+    Prefix tree over the words of the suggestions, every node keeps the top
+    suggestions below it so a lookup only walks the characters of the prefix
+    """
+
+    def __init__(self, suggestions: list[tuple[int, dict]], limit: int):
+        self.children = [{}]
+        self.top = [[]]
+
+        # Suggestions are inserted by descending weight, so the first ones
+        # reaching a node are its best ones
+        for weight, suggestion in sorted(
+            suggestions, key=lambda item: (-item[0], item[1]["text"])
+        ):
+            text = " ".join(suggestion["text"].lower().split())
+            starts = [0] + [index + 1 for index, char in enumerate(text) if char == " "]
+
+            for start in starts:
+                state = 0
+                for char in text[start : start + MAX_PREFIX_LENGTH]:
+                    next_state = self.children[state].get(char)
+                    if next_state is None:
+                        next_state = len(self.children)
+                        self.children[state][char] = next_state
+                        self.children.append({})
+                        self.top.append([])
+                    state = next_state
+
+                    top = self.top[state]
+                    if len(top) < limit and suggestion not in top:
+                        top.append(suggestion)
+
+    def lookup(self, prefix: str) -> list[dict]:
+        children = self.children
+
+        state = 0
+        for char in prefix:
+            state = children[state].get(char)
+            if state is None:
+                return []
+
+        return self.top[state] if state else []
+
+
+def normalize(prefix: str) -> str:
+    return " ".join(prefix.lower().split())[:MAX_PREFIX_LENGTH]
+
+
+def collect_suggestions() -> list[tuple[int, dict]]:
+    """
+    Return the (weight, suggestion) pairs of the products, brands and
+    categories, weighted by the units they sold
+    """
+    products = models.Product.objects.values_list(
+        "id", "name", Coalesce("stats__sold_units", 0)
+    )
+    brands = models.Brand.objects.annotate(
+        sold=Coalesce(Sum("product__stats__sold_units"), 0)
+    ).values_list("id", "name", "sold")
+    categories = models.Category.objects.annotate(
+        sold=Coalesce(Sum("product__stats__sold_units"), 0)
+    ).values_list("id", "title", "sold")
+
+    return [
+        (weight, {"text": text, "type": kind, "id": id})
+        for kind, rows in (
+            ("product", products),
+            ("brand", brands),
+            ("category", categories),
+        )
+        for id, text, weight in rows
+    ]
+
+
+_index = {"trie": None, "version": None, "built": 0}
+
+
+def get_index() -> SuggestionTrie:
+    """
+    Return the suggestions index of this process, rebuilding it when the
+    catalog changed or it is too old
+    """
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(INDEX_VERSION_KEY, version, None)
+        version = cache.get(INDEX_VERSION_KEY, version)
+
+    if (
+        _index["trie"] is None
+        or _index["version"] != version
+        or time.monotonic() - _index["built"] > INDEX_MAX_AGE
+    ):
+        _index.update(
+            trie=SuggestionTrie(collect_suggestions(), SUGGESTIONS_LIMIT),
+            version=version,
+            built=time.monotonic(),
+        )
+
+    return _index["trie"]
+
+
+def invalidate_index():
+    cache.set(INDEX_VERSION_KEY, time.time_ns(), None)
+
+
+def suggest(prefix: str, limit: int = SUGGESTIONS_LIMIT) -> list[dict]:
+    return get_index().lookup(normalize(prefix))[:limit]
@@ -0,0 +1,104 @@
+import time
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from . import caching
+
+BLACKLIST_VERSION_KEY = "token-blacklist:version"
+# Tokens removed from the blacklist by hand are only dropped by a full reload
+BLACKLIST_MAX_AGE = 60 * 60
+# Rows blacklisted shortly before the last sync are read again, as their
+# transactions may commit after the ones of newer rows
+SYNC_OVERLAP = timedelta(minutes=1)
+PRUNE_BATCH_SIZE = 1000
+
+_blacklist = {"jtis": None, "version": None, "synced_at": None, "loaded": 0}
+
+
+def get_version() -> int:
+    version = cache.get(BLACKLIST_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(BLACKLIST_VERSION_KEY, version, None)
+        version = cache.get(BLACKLIST_VERSION_KEY, version)
+
+    return version
+
+
+def load_jtis(since: datetime = None) -> dict[str, datetime]:
+    """
+    Return the expiration date of the unexpired blacklisted tokens by JTI,
+    only of the ones blacklisted since the given date if any
+    """
+    tokens = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+    if since is not None:
+        tokens = tokens.filter(blacklisted_at__gte=since - SYNC_OVERLAP)
+
+    return dict(tokens.values_list("token__jti", "token__expires_at"))
+
+
+def get_blacklist() -> dict[str, datetime]:
+    """
+    Return the blacklisted JTIs known by this process, reading only the
+    tokens blacklisted since the last sync when the blacklist changed
+    """
+    version = get_version()
+
+    if _blacklist["jtis"] is None or (
+        time.monotonic() - _blacklist["loaded"] > BLACKLIST_MAX_AGE
+    ):
+        now = timezone.now()
+        _blacklist.update(
+            jtis=load_jtis(), version=version, synced_at=now, loaded=time.monotonic()
+        )
+    elif _blacklist["version"] != version:
+        now = timezone.now()
+        jtis = {
+            jti: expires_at
+            for jti, expires_at in _blacklist["jtis"].items()
+            if expires_at > now
+        }
+        jtis.update(load_jtis(since=_blacklist["synced_at"]))
+        _blacklist.update(jtis=jtis, version=version, synced_at=now)
+
+    return _blacklist["jtis"]
+
+
+def is_blacklisted(jti: str) -> bool:
+    # The version bumps of a process-local cache never reach the other
+    # workers, which would keep accepting the tokens they blacklist
+    if not caching.is_shared():
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    return jti in get_blacklist()
+
+
+def invalidate_blacklist():
+    cache.set(BLACKLIST_VERSION_KEY, time.time_ns(), None)
+
+
+def prune_expired_tokens(batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    """
+    Delete the expired outstanding tokens, along with their blacklist
+    entries, a batch at a time and return the number of deleted tokens
+    """
+    now = timezone.now()
+    pruned = 0
+
+    while True:
+        token_ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not token_ids:
+            return pruned
+
+        # Deleting the tokens cascades to their blacklist entries
+        OutstandingToken.objects.filter(id__in=token_ids).only("id").delete()
+        pruned += len(token_ids)
@@ -0,0 +1,153 @@
+import hashlib
+import uuid
+from functools import wraps
+from typing import Iterable
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from . import models
+
+TAG_KEY_PREFIX = "cache-tag:"
+RESPONSE_KEY_PREFIX = "cache-response:"
+# Counts the invalidations, responses computed while it changed are not cached
+INVALIDATIONS_KEY = "cache-invalidations"
+
+
+def is_shared(alias: str = "default") -> bool:
+    """
+    Return whether the cache is seen by every worker, instead of being
+    local to each process
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def tag_key(tag: str) -> str:
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+
+def get_tag_versions(tags: Iterable[str]) -> dict:
+    """
+    Return the current version of every tag, creating the missing ones
+    """
+    keys = {tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+
+    for key in keys.keys() - versions.keys():
+        cache.add(key, uuid.uuid4().hex, None)
+        versions[key] = cache.get(key)
+
+    return versions
+
+
+def tags_are_current(versions: dict) -> bool:
+    return cache.get_many(versions.keys()) == versions
+
+
+def count_invalidations() -> int:
+    invalidations = cache.get(INVALIDATIONS_KEY)
+    if invalidations is None:
+        cache.add(INVALIDATIONS_KEY, 0, None)
+        invalidations = cache.get(INVALIDATIONS_KEY, 0)
+
+    return invalidations
+
+
+def expire_tags(keys: list[str]):
+    # Counted before deleting the tags, so a response reading the versions
+    # before the deletion sees the count change
+    try:
+        cache.incr(INVALIDATIONS_KEY)
+    except ValueError:
+        cache.add(INVALIDATIONS_KEY, 1, None)
+    cache.delete_many(keys)
+
+
+def invalidate_tags(*tags: str):
+    """
+    Expire every cached response depending on any of the given tags
+
+    Inside a transaction the tags are expired again once it commits, as
+    responses computed meanwhile may have cached the previous data
+    """
+    keys = [tag_key(tag) for tag in tags]
+    expire_tags(keys)
+
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: expire_tags(keys))
+
+
+def tagged(response: Response, tags: Iterable[str]) -> Response:
+    """
+    Mark the data a response depends on, so it can be cached by cache_response
+    """
+    response.cache_tags = set(tags)
+    return response
+
+
+def product_tags(products: Iterable[models.Product]) -> set:
+    tags = set()
+    for product in products:
+        tags.add(f"product:{product.id}")
+        tags.add(f"brand:{product.brand_id}")
+        tags.add(f"category:{product.category_id}")
+
+    return tags
+
+
+def response_key(request: Request, per_user: bool = False) -> str:
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    if per_user:
+        return f"{RESPONSE_KEY_PREFIX}user:{request.user.pk}:{path}"
+
+    return f"{RESPONSE_KEY_PREFIX}{path}"
+
+
+def cache_response(timeout: int, per_user: bool = False, local_timeout: int = None):
+    """
+    Cache the data of successful responses marked with tagged() until the
+    timeout expires or any of their tags is invalidated
+
+    Responses of authenticated endpoints must be cached per user, so the
+    entries of one principal are never served to another
+
+    Invalidations only reach the worker that made them when the cache is
+    local to each process, the other workers keep the entries until
+    local_timeout (the timeout by default) expires
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request: Request, *args, **kwargs):
+            key = response_key(request, per_user)
+
+            cached = cache.get(key)
+            if cached is not None:
+                data, versions = cached
+                if tags_are_current(versions):
+                    return Response(data)
+
+            invalidations = count_invalidations()
+            response = view_method(self, request, *args, **kwargs)
+
+            tags = getattr(response, "cache_tags", None)
+            if response.status_code == 200 and tags is not None:
+                versions = get_tag_versions(tags)
+                # Tags invalidated while the view ran may already be recreated
+                # by get_tag_versions, the data would be stored as current
+                if count_invalidations() == invalidations:
+                    cache.set(
+                        key,
+                        (response.data, versions),
+                        timeout if is_shared() else local_timeout or timeout,
+                    )
+
+            return response
+
+        return wrapper
+
+    return decorator
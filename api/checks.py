@@ -0,0 +1,18 @@
+from django.core.checks import Error, Tags, register
+
+from . import caching
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if caching.is_shared():
+        return []
+
+    return [
+        Error(
+            "The default cache is local to each process, the workers would "
+            "not see each other's invalidations, quotas or throttles.",
+            hint="Set REDIS_URL to use a shared Redis cache.",
+            id="api.E001",
+        )
+    ]
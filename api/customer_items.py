@@ -0,0 +1,81 @@
+from django.db import transaction
+from typing import Iterable
+
+from . import models
+
+CART_ITEMS_LIMIT = 10
+FAV_ITEMS_LIMIT = 25
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+def add_items(
+    item_model,
+    customer: models.Customer,
+    product_ids: Iterable[int],
+    limit: int,
+    source_model=None,
+) -> int:
+    """
+    Add the products to the cart or favorites (the item model) of the
+    customer, removing them from the source model if given, and return the
+    number of new items
+
+    Products already added are skipped, LimitExceeded is raised when the
+    items would exceed the limit and Product.DoesNotExist for unknown products.
+    When moving items only the products found in the source are moved, the
+    source model DoesNotExist is raised when none of them is
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+
+    with transaction.atomic():
+        # Concurrent additions of the same customer wait here, so the limit
+        # is checked against the final number of items
+        models.Customer.objects.select_for_update().filter(pk=customer.pk).exists()
+
+        if source_model is not None:
+            source_ids = set(
+                source_model.objects.filter(
+                    customer=customer, product__in=product_ids
+                ).values_list("product", flat=True)
+            )
+            product_ids = [
+                product_id for product_id in product_ids if product_id in source_ids
+            ]
+            if not product_ids:
+                raise source_model.DoesNotExist(
+                    f"{source_model.__name__} matching query does not exist."
+                )
+
+        existing_ids = set(
+            item_model.objects.filter(customer=customer).values_list(
+                "product", flat=True
+            )
+        )
+        new_ids = [
+            product_id for product_id in product_ids if product_id not in existing_ids
+        ]
+
+        if len(existing_ids) + len(new_ids) > limit:
+            raise LimitExceeded(limit)
+
+        products_count = models.Product.objects.filter(id__in=new_ids).count()
+        if products_count != len(new_ids):
+            raise models.Product.DoesNotExist("Product matching query does not exist.")
+
+        item_model.objects.bulk_create(
+            [
+                item_model(product_id=product_id, customer=customer)
+                for product_id in new_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+        if source_model is not None:
+            source_model.objects.filter(
+                customer=customer, product__in=product_ids
+            ).delete()
+
+    return len(new_ids)
@@ -0,0 +1,77 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from typing import Iterable
+
+from . import models
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids: list[int]):
+        self.product_ids = product_ids
+        super().__init__(f"Not enough stock of the products {product_ids}")
+
+
+def count_units(order_items: Iterable[models.OrderItem]) -> Counter:
+    units = Counter()
+    for order_item in order_items:
+        units[order_item.product_id] += order_item.quantity
+
+    return units
+
+
+def per_product(units: Counter) -> Case:
+    return Case(
+        *[
+            When(id=product_id, then=Value(quantity))
+            for product_id, quantity in units.items()
+        ],
+        default=Value(0),
+    )
+
+
+def reserve_stock(order_items: Iterable[models.OrderItem]):
+    """
+    Take the units of the order items out of the stock of their products,
+    either all of them are reserved or OutOfStock is raised
+
+    Must run inside a transaction, the product rows stay locked until it ends
+    """
+    units = count_units(order_items)
+    if not units:
+        return
+
+    with transaction.atomic():
+        # Locking the rows in a consistent order prevents deadlocks between
+        # checkouts sharing products
+        stocks = dict(
+            models.Product.objects.select_for_update()
+            .filter(id__in=units)
+            .order_by("id")
+            .values_list("id", "stock")
+        )
+
+        missing = [
+            product_id
+            for product_id, quantity in units.items()
+            if stocks.get(product_id, 0) < quantity
+        ]
+        if missing:
+            raise OutOfStock(sorted(missing))
+
+        models.Product.objects.filter(id__in=units).update(
+            stock=F("stock") - per_product(units)
+        )
+
+
+def release_stock(order_items: Iterable[models.OrderItem]):
+    """
+    Give the units of the order items back to the stock of their products
+    """
+    units = count_units(order_items)
+    if not units:
+        return
+
+    models.Product.objects.filter(id__in=units).update(
+        stock=F("stock") + per_product(units)
+    )
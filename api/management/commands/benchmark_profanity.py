@@ -0,0 +1,64 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from api import validators
+
+SAMPLES = [
+    "Very good, i love it",
+    "I love it, good choice!",
+    "gotiergod",
+    "Not so good as i expected, the battery lasts nothing",
+]
+
+
+def legacy_profanity_check(value):
+    """
+    The previous implementation, reading the dataset with pandas and scanning
+    every row on each call
+    """
+    import pandas
+
+    df = pandas.read_csv(validators.BAD_WORDS_PATH)
+    input_text = str(value).lower()
+
+    for index, row in df.iterrows():
+        if row["word"].lower() in input_text:
+            return True
+
+    return False
+
+
+class Command(BaseCommand):
+    help = "Compare the compiled profanity matcher against the previous CSV scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=10000)
+        parser.add_argument("--legacy-number", type=int, default=20)
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        legacy_number = options["legacy_number"]
+
+        # Warm up, the matcher is compiled once per process
+        validators.contains_profanity(SAMPLES[0])
+
+        matcher_time = timeit.timeit(
+            lambda: [validators.contains_profanity(text) for text in SAMPLES],
+            number=number,
+        ) / (number * len(SAMPLES))
+        self.stdout.write(f"Compiled matcher: {matcher_time * 1e6:.2f} µs per check")
+
+        try:
+            legacy_time = timeit.timeit(
+                lambda: [legacy_profanity_check(text) for text in SAMPLES],
+                number=legacy_number,
+            ) / (legacy_number * len(SAMPLES))
+        except ImportError:
+            self.stdout.write("Pandas is not installed, skipping the CSV scan.")
+            return
+
+        self.stdout.write(f"CSV scan: {legacy_time * 1e3:.2f} ms per check")
+        self.stdout.write(
+            self.style.SUCCESS(f"Speedup: {legacy_time / matcher_time:.0f}x")
+        )
@@ -0,0 +1,111 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from api import models
+
+# Indexes added for the queries below, by model
+INDEXES = {
+    models.Brand: ["api_brand_name_upper_idx"],
+    models.Category: ["api_category_title_upper_idx"],
+    models.Product: ["api_product_category_price_idx"],
+    models.Review: ["api_review_product_visible_idx", "api_review_date_idx"],
+    models.Order: ["api_order_active_idx", "api_order_purchase_date_idx"],
+    models.OrderItem: ["api_orderitem_sales_idx"],
+}
+
+# Queries of the endpoints using the indexes, with arbitrary filter values
+QUERIES = {
+    "Products filtered by category and price": lambda: models.Product.objects.filter(
+        category__title__iexact="laptops", offer_price__gte=500, offer_price__lte=1500
+    ),
+    "Products filtered by brand": lambda: models.Product.objects.filter(
+        brand__name__iexact="samsung"
+    ),
+    "Reviews of a product": lambda: models.Review.objects.filter(
+        product=1, hidden=False
+    ).order_by("-date", "-id")[:10],
+    "Daily reviews quota": lambda: models.Review.objects.filter(date=date.today()).only(
+        "id"
+    ),
+    "Active orders quota": lambda: models.Order.objects.filter(
+        customer=1, delivered=False
+    ).only("id"),
+    "Daily orders quota": lambda: models.Order.objects.filter(
+        purchase_date=date.today()
+    ).only("id"),
+    "Product sales": lambda: models.OrderItem.objects.filter(product__in=[1, 2, 3])
+    .values("product")
+    .annotate(units=Sum("quantity"), lines=Count("*"))
+    .order_by(),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the query plans of the endpoint queries without and with their "
+        "indexes, which are dropped inside a transaction rolled back afterwards. "
+        "The tables stay locked meanwhile, run it against a copy of the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--disable-seqscan",
+            action="store_true",
+            help="Discourage sequential scans (PostgreSQL), so small tables use "
+            "the indexes too",
+        )
+
+    def handle(self, *args, **options):
+        if options["disable_seqscan"] and connection.vendor != "postgresql":
+            raise CommandError("--disable-seqscan is only supported on PostgreSQL.")
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(
+                "The indexes can only be dropped temporarily on databases "
+                "supporting transactional DDL."
+            )
+
+        with transaction.atomic():
+            if options["disable_seqscan"]:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            plans_after = self.explain()
+
+            with connection.schema_editor() as schema_editor:
+                for model, index_names in INDEXES.items():
+                    for index in self.existing_indexes(model, index_names):
+                        schema_editor.remove_index(model, index)
+
+            plans_before = self.explain()
+            # Restores the indexes
+            transaction.set_rollback(True)
+
+        for description in QUERIES:
+            self.stdout.write(self.style.MIGRATE_HEADING(description))
+            self.stdout.write(self.style.MIGRATE_LABEL("Before:"))
+            self.stdout.write(plans_before[description])
+            self.stdout.write(self.style.MIGRATE_LABEL("After:"))
+            self.stdout.write(plans_after[description] + "\n")
+
+    def explain(self) -> dict[str, str]:
+        return {
+            description: query().explain() for description, query in QUERIES.items()
+        }
+
+    def existing_indexes(self, model, index_names: list[str]) -> list:
+        """
+        Return the indexes of the model with the given names, skipping the
+        ones not created on this database vendor
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+
+        return [
+            index
+            for index in model._meta.indexes
+            if index.name in index_names and index.name in constraints
+        ]
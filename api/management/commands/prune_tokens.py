@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api import blacklist
+
+
+class Command(BaseCommand):
+    help = "Delete the expired outstanding tokens and their blacklist entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=blacklist.PRUNE_BATCH_SIZE,
+            help="Number of tokens deleted per query",
+        )
+
+    def handle(self, *args, **options):
+        pruned = blacklist.prune_expired_tokens(options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {pruned} expired tokens."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api import rankings
+from api import stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product statistics from the order items and reviews tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "product_ids",
+            nargs="*",
+            type=int,
+            help="Only rebuild the statistics of these products",
+        )
+
+    def handle(self, *args, **options):
+        product_stats = stats.rebuild_product_stats(options["product_ids"] or None)
+        rankings.refresh_best_sellers()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt statistics of {len(product_stats)} products.")
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index from scratch"
+
+    def handle(self, *args, **options):
+        indexed_products = search.rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed_products} products."))
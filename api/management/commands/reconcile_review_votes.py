@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import votes
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the likes, dislikes and reports of the reviews, fixing drifted "
+        "counters"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "review_ids",
+            nargs="*",
+            type=int,
+            help="Only reconcile the counters of these reviews",
+        )
+
+    def handle(self, *args, **options):
+        fixed_ids = votes.reconcile_vote_counters(options["review_ids"] or None)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Fixed vote counters of {len(fixed_ids)} reviews.")
+        )
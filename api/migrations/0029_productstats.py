@@ -0,0 +1,66 @@
+# Generated by Django 4.2.13 on 2026-10-17 18:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_product_stats(apps, schema_editor):
+    Product = apps.get_model('api', 'Product')
+    ProductStats = apps.get_model('api', 'ProductStats')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    Review = apps.get_model('api', 'Review')
+
+    sales = {
+        item['product']: item
+        for item in OrderItem.objects.values('product')
+        .annotate(units=models.Sum('quantity'), lines=models.Count('id'))
+        .order_by()
+    }
+    reviews = {
+        item['product']: item
+        for item in Review.objects.values('product')
+        .annotate(count=models.Count('id'), rating=models.Sum('rating'))
+        .order_by()
+    }
+
+    product_stats = []
+    for product_id in Product.objects.values_list('id', flat=True):
+        product_sales = sales.get(product_id, {})
+        product_reviews = reviews.get(product_id, {})
+        review_count = product_reviews.get('count', 0)
+        rating_sum = product_reviews.get('rating') or 0
+
+        product_stats.append(
+            ProductStats(
+                product_id=product_id,
+                sold_units=product_sales.get('units', 0),
+                order_lines=product_sales.get('lines', 0),
+                review_count=review_count,
+                rating_sum=rating_sum,
+                rating_avg=rating_sum / review_count if review_count else None,
+            )
+        )
+
+    ProductStats.objects.bulk_create(product_stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_alter_review_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.product')),
+                ('sold_units', models.PositiveIntegerField(default=0)),
+                ('order_lines', models.PositiveIntegerField(db_index=True, default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.FloatField(default=0)),
+                ('rating_avg', models.FloatField(db_index=True, default=None, null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_product_stats, migrations.RunPython.noop),
+    ]
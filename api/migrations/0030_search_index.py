@@ -0,0 +1,72 @@
+# Generated by Django 4.2.13 on 2026-10-17 18:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+from collections import Counter
+
+
+def build_search_index(apps, schema_editor):
+    Product = apps.get_model('api', 'Product')
+    SearchDocument = apps.get_model('api', 'SearchDocument')
+    SearchTerm = apps.get_model('api', 'SearchTerm')
+
+    def tokenize(text):
+        return [token[:255] for token in re.findall(r'\w+', text.lower())]
+
+    documents = []
+    search_terms = []
+    products = Product.objects.select_related('brand', 'category').prefetch_related(
+        'productspecification_set'
+    )
+    for product in products:
+        terms = Counter()
+        for token in tokenize(product.name):
+            terms[token] += 3
+        for token in tokenize(product.brand.name) + tokenize(product.category.title):
+            terms[token] += 2
+        for specification in product.productspecification_set.all():
+            for token in tokenize(specification.value):
+                terms[token] += 1
+
+        documents.append(
+            SearchDocument(product=product, length=sum(terms.values()))
+        )
+        search_terms.extend(
+            SearchTerm(term=term, frequency=frequency, product=product)
+            for term, frequency in terms.items()
+        )
+
+    SearchDocument.objects.bulk_create(documents)
+    SearchTerm.objects.bulk_create(search_terms)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_productstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='api.product')),
+                ('length', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=255)),
+                ('frequency', models.PositiveIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='api.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='api_searchterm_term_idx', opclasses=['varchar_pattern_ops'])],
+                'unique_together': {('term', 'product')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.13 on 2026-10-17 18:58
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_review_votes(apps, schema_editor):
+    Review = apps.get_model('api', 'Review')
+
+    def count_votes(model_name):
+        votes = (
+            apps.get_model('api', model_name)
+            .objects.filter(review=models.OuterRef('pk'))
+            .order_by()
+            .values('review')
+            .annotate(count=models.Count('id'))
+            .values('count')
+        )
+        return Coalesce(models.Subquery(votes), 0)
+
+    Review.objects.update(
+        likes_count=count_votes('ReviewLike'),
+        dislikes_count=count_votes('ReviewDislike'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_review_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.13 on 2026-10-17 19:01
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_review_reports(apps, schema_editor):
+    Review = apps.get_model('api', 'Review')
+    ReviewReport = apps.get_model('api', 'ReviewReport')
+
+    reports = (
+        ReviewReport.objects.filter(review=models.OuterRef('pk'))
+        .order_by()
+        .values('review')
+        .annotate(count=models.Count('id'))
+        .values('count')
+    )
+    Review.objects.update(reports_count=Coalesce(models.Subquery(reports), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_review_vote_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_review_reports, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='review',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(models.OrderBy(models.F('reports_count'), descending=True), condition=models.Q(('reports_count__gt', 0)), name='api_review_reported_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.13 on 2026-10-17 19:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_review_moderation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewdislike',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='reviewlike',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='reviewreport',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='reviewdislike',
+            index=models.Index(fields=['customer', 'review'], name='api_reviewd_custome_5a819e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewdislike',
+            index=models.Index(fields=['customer', 'created_at'], name='api_reviewd_custome_5a2796_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewlike',
+            index=models.Index(fields=['customer', 'review'], name='api_reviewl_custome_86fcf1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewlike',
+            index=models.Index(fields=['customer', 'created_at'], name='api_reviewl_custome_0f0292_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewreport',
+            index=models.Index(fields=['customer', 'review'], name='api_reviewr_custome_603bbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewreport',
+            index=models.Index(fields=['customer', 'created_at'], name='api_reviewr_custome_4d4ae8_idx'),
+        ),
+    ]
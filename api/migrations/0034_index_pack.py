@@ -0,0 +1,79 @@
+# Generated by Django 4.2.13 on 2026-10-17 19:05
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class AddIndexOnVendors(migrations.AddIndex):
+    """
+    AddIndex only creating the index on the given database vendors, where
+    the queries can use it, the index is always added to the model state
+    """
+
+    def __init__(self, vendors, model_name, index):
+        self.vendors = vendors
+        super().__init__(model_name, index)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, args, {'vendors': self.vendors, **kwargs}
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor in self.vendors:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor in self.vendors:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+# iexact lookups only compare UPPER() values on PostgreSQL
+UPPER_VENDORS = ('postgresql',)
+# Other vendors ignore the condition and would index every row
+PARTIAL_VENDORS = ('postgresql', 'sqlite')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_review_interactions_created_at'),
+    ]
+
+    operations = [
+        AddIndexOnVendors(
+            vendors=UPPER_VENDORS,
+            model_name='brand',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='api_brand_name_upper_idx'),
+        ),
+        AddIndexOnVendors(
+            vendors=UPPER_VENDORS,
+            model_name='category',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='api_category_title_upper_idx'),
+        ),
+        AddIndexOnVendors(
+            vendors=PARTIAL_VENDORS,
+            model_name='order',
+            index=models.Index(condition=models.Q(('delivered', False)), fields=['customer'], name='api_order_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['purchase_date'], name='api_order_purchase_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['product', 'quantity'], name='api_orderitem_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'offer_price'], name='api_product_category_price_idx'),
+        ),
+        AddIndexOnVendors(
+            vendors=PARTIAL_VENDORS,
+            model_name='review',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['product', '-date', '-id'], name='api_review_product_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['date'], name='api_review_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_index_pack'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='interactions_removed_at',
+            field=models.DateTimeField(default=None, editable=False, null=True),
+        ),
+    ]
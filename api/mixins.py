@@ -0,0 +1,48 @@
+from rest_framework.request import Request
+
+from . import models
+from . import tokens
+
+
+class CustomerMixin:
+    """
+    Resolve the customer of the authenticated user once per request, actions
+    listed in stateless_actions are authenticated from the token claims and
+    read the customer ID from them
+    """
+
+    stateless_actions = ()
+
+    def get_customer(self, request: Request) -> models.Customer:
+        customer = getattr(request, "_customer", None)
+        if customer is not None:
+            return customer
+
+        user = request.user
+        if isinstance(user, tokens.CustomerTokenUser):
+            customer = models.Customer.objects.select_related("user").get(
+                id=self.get_customer_id(request)
+            )
+        else:
+            customer = models.Customer.objects.get(user=user)
+            # The authenticated user is already loaded, share it so
+            # customer.user neither queries it again nor gets out of sync
+            customer.user = user
+
+        request._customer = customer
+        return customer
+
+    def get_customer_id(self, request: Request) -> int:
+        customer = getattr(request, "_customer", None)
+        if customer is not None:
+            return customer.pk
+
+        user = request.user
+        if isinstance(user, tokens.CustomerTokenUser):
+            if user.customer_id is None:
+                raise models.Customer.DoesNotExist(
+                    "Customer matching query does not exist."
+                )
+            return user.customer_id
+
+        return models.Customer.objects.values_list("id", flat=True).get(user=user)
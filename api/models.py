@@ -7,6 +7,7 @@ from django.core.validators import (
     MaxLengthValidator,
 )
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Upper
 from . import validators
 
 
@@ -19,6 +20,12 @@ class Category(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    class Meta:
+        indexes = [
+            # Matches the UPPER() comparisons of iexact lookups on PostgreSQL
+            models.Index(Upper("title"), name="api_category_title_upper_idx"),
+        ]
+
 
 class Brand(models.Model):
     name = models.CharField(max_length=45)
@@ -29,6 +36,12 @@ class Brand(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    class Meta:
+        indexes = [
+            # Matches the UPPER() comparisons of iexact lookups on PostgreSQL
+            models.Index(Upper("name"), name="api_brand_name_upper_idx"),
+        ]
+
 
 class Customer(models.Model):
     birthdate = models.DateField()
@@ -47,6 +60,10 @@ class Customer(models.Model):
         default=0, validators=[MaxValueValidator(1000000)]
     )
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # Last time a like or dislike was withdrawn, which interaction deltas miss
+    interactions_removed_at = models.DateTimeField(
+        null=True, default=None, editable=False
+    )
 
     def __str__(self) -> str:
         return self.user.username
@@ -97,6 +114,28 @@ class Product(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["category", "offer_price"],
+                name="api_product_category_price_idx",
+            ),
+        ]
+
+
+class ProductStats(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    sold_units = models.PositiveIntegerField(default=0)
+    order_lines = models.PositiveIntegerField(default=0, db_index=True)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    rating_avg = models.FloatField(null=True, default=None, db_index=True)
+
+    def __str__(self) -> str:
+        return self.product.name
+
 
 # This feature is not in use but could be implemented in the future
 class ProductSpecification(models.Model):
@@ -111,6 +150,41 @@ class ProductSpecification(models.Model):
         unique_together = ("key", "product")
 
 
+class SearchDocument(models.Model):
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    length = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return self.product.name
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=255)
+    frequency = models.PositiveIntegerField()
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="search_terms"
+    )
+
+    def __str__(self) -> str:
+        return self.term
+
+    class Meta:
+        unique_together = ("term", "product")
+        indexes = [
+            # Allows prefix lookups (LIKE 'term%') to use the index on PostgreSQL
+            models.Index(
+                fields=["term"],
+                name="api_searchterm_term_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
+
 class ProductImage(models.Model):
     url = models.CharField(max_length=255)
     description = models.CharField(max_length=45)
@@ -147,9 +221,14 @@ class Review(models.Model):
     )
     date = models.DateField(auto_now_add=True, editable=False)
     is_useful = models.BooleanField(default=False)
-    hidden = models.BooleanField(default=True)
+    # Reviews are hidden automatically when reported too many times
+    hidden = models.BooleanField(default=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Kept up to date by api.votes, reconcile_review_votes repairs any drift
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    dislikes_count = models.PositiveIntegerField(default=0, editable=False)
+    reports_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return f"({self.rating}) {self.content}"
@@ -161,30 +240,60 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ("customer", "product")
+        indexes = [
+            # Moderation queue, only reported reviews are indexed
+            models.Index(
+                models.F("reports_count").desc(),
+                name="api_review_reported_idx",
+                condition=models.Q(reports_count__gt=0),
+            ),
+            # Visible reviews of a product, newest first
+            models.Index(
+                fields=["product", "-date", "-id"],
+                name="api_review_product_visible_idx",
+                condition=models.Q(hidden=False),
+            ),
+            models.Index(fields=["date"], name="api_review_date_idx"),
+        ]
 
 
 class ReviewLike(models.Model):
     review = models.ForeignKey(Review, on_delete=models.CASCADE)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("review", "customer")
+        indexes = [
+            models.Index(fields=["customer", "review"]),
+            models.Index(fields=["customer", "created_at"]),
+        ]
 
 
 class ReviewDislike(models.Model):
     review = models.ForeignKey(Review, on_delete=models.CASCADE)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("review", "customer")
+        indexes = [
+            models.Index(fields=["customer", "review"]),
+            models.Index(fields=["customer", "created_at"]),
+        ]
 
 
 class ReviewReport(models.Model):
     review = models.ForeignKey(Review, on_delete=models.CASCADE)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("review", "customer")
+        indexes = [
+            models.Index(fields=["customer", "review"]),
+            models.Index(fields=["customer", "created_at"]),
+        ]
 
 
 class Order(models.Model):
@@ -219,6 +328,17 @@ class Order(models.Model):
         if current_active_orders >= max_active_orders:
             raise ValidationError("You cannot have more than 3 active orders.")
 
+    class Meta:
+        indexes = [
+            # Active orders of a customer
+            models.Index(
+                fields=["customer"],
+                name="api_order_active_idx",
+                condition=models.Q(delivered=False),
+            ),
+            models.Index(fields=["purchase_date"], name="api_order_purchase_date_idx"),
+        ]
+
 
 class OrderItem(models.Model):
     total_cost = models.DecimalField(max_digits=7, decimal_places=2, editable=False)
@@ -236,6 +356,14 @@ class OrderItem(models.Model):
 
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            # Sales of a product are summed from the index alone
+            models.Index(
+                fields=["product", "quantity"], name="api_orderitem_sales_idx"
+            ),
+        ]
+
 
 class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
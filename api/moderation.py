@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, QuerySet, Value, When
+
+from . import caching
+from . import models
+
+
+class AlreadyReported(Exception):
+    pass
+
+
+def report_review(review_id: int, customer_id: int) -> bool:
+    """
+    Record the report of a customer, hiding the review when its reports
+    reach the threshold, and return whether the review is hidden
+    """
+    threshold = settings.REVIEW_REPORT_THRESHOLD
+
+    with transaction.atomic():
+        # Raises Review.DoesNotExist for unknown reviews
+        review = (
+            models.Review.objects.select_for_update()
+            .only("id", "product", "hidden", "reports_count")
+            .get(id=review_id)
+        )
+
+        try:
+            with transaction.atomic():
+                models.ReviewReport.objects.create(
+                    review_id=review_id, customer_id=customer_id
+                )
+        except IntegrityError:
+            raise AlreadyReported(review_id)
+
+        # Only crossing the threshold hides the review, so reviews approved
+        # by a moderator are not hidden again by the next report
+        models.Review.objects.filter(id=review_id).update(
+            reports_count=F("reports_count") + 1,
+            hidden=Case(
+                When(reports_count=threshold - 1, then=Value(True)),
+                default=F("hidden"),
+            ),
+        )
+
+    hidden = review.hidden or review.reports_count + 1 == threshold
+    if hidden != review.hidden:
+        caching.invalidate_tags(f"reviews:product:{review.product_id}")
+
+    return hidden
+
+
+def remove_customer_reports(customer_id: int):
+    """
+    Discount the reports of a customer from the reviews, before the reports
+    are deleted along with them, showing again the reviews falling back
+    below the threshold
+    """
+    threshold = settings.REVIEW_REPORT_THRESHOLD
+
+    reported = models.Review.objects.filter(
+        id__in=models.ReviewReport.objects.filter(customer=customer_id).values("review")
+    )
+    product_ids = set(reported.values_list("product", flat=True))
+    if not product_ids:
+        return
+
+    reported.update(
+        reports_count=F("reports_count") - 1,
+        hidden=Case(
+            When(reports_count=threshold, then=Value(False)),
+            default=F("hidden"),
+        ),
+    )
+
+    caching.invalidate_tags(
+        *[f"reviews:product:{product_id}" for product_id in product_ids]
+    )
+
+
+def set_hidden(reviews: QuerySet[models.Review], hidden: bool) -> int:
+    """
+    Hide or show the reviews with a single update
+    """
+    product_ids = set(reviews.values_list("product", flat=True))
+    updated = reviews.update(hidden=hidden)
+
+    caching.invalidate_tags(
+        *[f"reviews:product:{product_id}" for product_id in product_ids]
+    )
+
+    return updated
@@ -0,0 +1,100 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values: list, direction: str) -> str:
+    payload = json.dumps({"v": values, "d": direction}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[list, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values, direction = payload["v"], payload["d"]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+
+    return values, direction
+
+
+def keyset_filter(ordering: tuple[str], values: list, reverse: bool = False) -> Q:
+    """
+    Condition selecting the rows placed after (or before when reversed) the
+    given values of the ordering fields
+    """
+    conditions = []
+    for index, field in enumerate(ordering):
+        descending = field.startswith("-") != reverse
+        name = field.lstrip("-")
+
+        condition = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[index]})
+        for previous_field, value in zip(ordering[:index], values):
+            condition &= Q(**{previous_field.lstrip("-"): value})
+
+        conditions.append(condition)
+
+    return reduce(or_, conditions)
+
+
+def reverse_ordering(ordering: tuple[str]) -> tuple[str]:
+    return tuple(
+        field.lstrip("-") if field.startswith("-") else f"-{field}"
+        for field in ordering
+    )
+
+
+def paginate_by_cursor(
+    queryset: QuerySet, cursor: str, ordering: tuple[str], page_size: int
+):
+    """
+    Return a page of the queryset along with the opaque cursors of the next
+    and previous pages, the ordering must be unique (end it with the primary
+    key) and its fields cannot be null
+
+    Pages are located by the values of the ordering fields of their first or
+    last row, so no count nor offset scan is needed
+    """
+    if cursor:
+        values, direction = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor(cursor)
+    else:
+        values, direction = None, "next"
+
+    if direction == "next":
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        items = list(queryset.order_by(*ordering)[: page_size + 1])
+        has_next, has_previous = len(items) > page_size, values is not None
+        items = items[:page_size]
+    else:
+        queryset = queryset.filter(keyset_filter(ordering, values, reverse=True))
+        items = list(queryset.order_by(*reverse_ordering(ordering))[: page_size + 1])
+        has_next, has_previous = True, len(items) > page_size
+        items = items[:page_size][::-1]
+
+    def cursor_values(item):
+        return [getattr(item, field.lstrip("-")) for field in ordering]
+
+    next_cursor = (
+        encode_cursor(cursor_values(items[-1]), "next") if items and has_next else None
+    )
+    previous_cursor = (
+        encode_cursor(cursor_values(items[0]), "prev")
+        if items and has_previous
+        else None
+    )
+
+    return items, next_cursor, previous_cursor
@@ -0,0 +1,111 @@
+from contextlib import contextmanager
+from datetime import date
+from django.core.cache import cache
+from typing import Callable
+
+from . import caching
+from . import models
+
+DAILY_ACCOUNTS_LIMIT = 50
+DAILY_ORDERS_LIMIT = 100
+DAILY_REVIEWS_LIMIT = 100
+ACTIVE_ORDERS_LIMIT = 3
+
+# Counters are seeded from the database and expire after this time, so they
+# are periodically reconciled with the rows created or deleted elsewhere
+RECONCILE_INTERVAL = 60 * 10
+
+
+class Quota:
+    """
+    Counter of a limited resource kept in the cache, acquiring a unit is a
+    single atomic increment once the counter is seeded from the database
+    """
+
+    def __init__(self, key: str, limit: int, count: Callable[[], int]):
+        self.key = f"quota:{key}"
+        self.limit = limit
+        self.count = count
+
+    def acquire(self) -> bool:
+        # Counters local to each process would let every worker take the
+        # whole quota, the rows are counted instead
+        if not caching.is_shared():
+            return self.count() < self.limit
+
+        for _ in range(2):
+            # Only count the rows when the counter is missing
+            if cache.get(self.key) is None:
+                cache.add(self.key, self.count(), RECONCILE_INTERVAL)
+            try:
+                used = cache.incr(self.key)
+            except ValueError:
+                # The counter expired between seeding and incrementing it
+                continue
+
+            if used > self.limit:
+                self.release()
+                return False
+
+            return True
+
+        return self.count() < self.limit
+
+    def release(self):
+        try:
+            cache.decr(self.key)
+        except ValueError:
+            pass
+
+    def reset(self):
+        cache.delete(self.key)
+
+
+@contextmanager
+def held(*quotas: Quota):
+    """
+    Give the acquired quotas back if the block raises
+    """
+    try:
+        yield
+    except BaseException:
+        for quota in quotas:
+            quota.release()
+        raise
+
+
+def daily_accounts() -> Quota:
+    today = date.today()
+    return Quota(
+        f"accounts:{today.isoformat()}",
+        DAILY_ACCOUNTS_LIMIT,
+        lambda: models.User.objects.filter(date_joined__date=today).count(),
+    )
+
+
+def daily_orders() -> Quota:
+    today = date.today()
+    return Quota(
+        f"orders:{today.isoformat()}",
+        DAILY_ORDERS_LIMIT,
+        lambda: models.Order.objects.filter(purchase_date=today).count(),
+    )
+
+
+def daily_reviews() -> Quota:
+    today = date.today()
+    return Quota(
+        f"reviews:{today.isoformat()}",
+        DAILY_REVIEWS_LIMIT,
+        lambda: models.Review.objects.filter(date=today).count(),
+    )
+
+
+def active_orders(customer_id: int) -> Quota:
+    return Quota(
+        f"active-orders:{customer_id}",
+        ACTIVE_ORDERS_LIMIT,
+        lambda: models.Order.objects.filter(
+            customer=customer_id, delivered=False
+        ).count(),
+    )
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+
+from . import caching
+from . import models
+
+BEST_SELLERS_KEY = "rankings:best-sellers"
+BEST_SELLERS_LIMIT = 25
+# The ranking is refreshed once every order item write is committed, only
+# in the worker making it when the cache is local to each process
+BEST_SELLERS_TIMEOUT = 60 * 60 * 24
+BEST_SELLERS_LOCAL_TIMEOUT = 60 * 5
+
+
+def compute_best_sellers() -> frozenset:
+    best_sellers = (
+        models.ProductStats.objects.filter(order_lines__gt=0)
+        .order_by("-order_lines")
+        .values_list("product", flat=True)[:BEST_SELLERS_LIMIT]
+    )
+
+    return frozenset(best_sellers)
+
+
+def refresh_best_sellers() -> tuple[int, frozenset]:
+    """
+    Recompute the best sellers ranking, storing it with a new version stamp
+    when it changed
+    """
+    cached = cache.get(BEST_SELLERS_KEY)
+    best_sellers = compute_best_sellers()
+
+    if cached and cached[1] == best_sellers:
+        ranking = cached
+    else:
+        ranking = (cached[0] + 1 if cached else 1, best_sellers)
+        caching.invalidate_tags("best-sellers")
+
+    cache.set(
+        BEST_SELLERS_KEY,
+        ranking,
+        BEST_SELLERS_TIMEOUT if caching.is_shared() else BEST_SELLERS_LOCAL_TIMEOUT,
+    )
+
+    return ranking
+
+
+def get_best_sellers_ranking() -> tuple[int, frozenset]:
+    """
+    Return the stored (version, product IDs) ranking, computing it if missing
+    """
+    ranking = cache.get(BEST_SELLERS_KEY)
+    if ranking is None:
+        ranking = refresh_best_sellers()
+
+    return ranking
+
+
+def get_best_sellers() -> frozenset:
+    return get_best_sellers_ranking()[1]
@@ -0,0 +1,158 @@
+import math
+import re
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from typing import Iterable
+
+from . import models
+
+TOKEN_REGEX = re.compile(r"\w+")
+MAX_TERM_LENGTH = 255
+
+# Each occurrence of a token counts as many times as the weight of its field
+FIELD_WEIGHTS = {"name": 3, "brand": 2, "category": 2, "specification": 1}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+INDEX_STATS_KEY = "search:index-stats"
+
+
+def tokenize(text: str) -> list[str]:
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_REGEX.findall(text.lower())]
+
+
+def product_terms(product: models.Product) -> Counter:
+    terms = Counter()
+    fields = [
+        ("name", product.name),
+        ("brand", product.brand.name),
+        ("category", product.category.title),
+    ] + [
+        ("specification", specification.value)
+        for specification in product.productspecification_set.all()
+    ]
+
+    for field, text in fields:
+        for token in tokenize(text):
+            terms[token] += FIELD_WEIGHTS[field]
+
+    return terms
+
+
+def index_products(product_ids: Iterable[int] = None):
+    """
+    Rebuild the index entries of the given products (all of them by default)
+    """
+    products = models.Product.objects.select_related(
+        "brand", "category"
+    ).prefetch_related("productspecification_set")
+    if product_ids is not None:
+        products = products.filter(id__in=list(product_ids))
+
+    documents = []
+    search_terms = []
+    for product in products:
+        terms = product_terms(product)
+        documents.append(
+            models.SearchDocument(product=product, length=sum(terms.values()))
+        )
+        search_terms.extend(
+            models.SearchTerm(term=term, frequency=frequency, product=product)
+            for term, frequency in terms.items()
+        )
+
+    indexed_ids = [document.product_id for document in documents]
+    with transaction.atomic():
+        models.SearchTerm.objects.filter(product__in=indexed_ids).delete()
+        models.SearchDocument.objects.filter(product__in=indexed_ids).delete()
+        models.SearchDocument.objects.bulk_create(documents)
+        models.SearchTerm.objects.bulk_create(search_terms)
+
+    cache.delete(INDEX_STATS_KEY)
+
+    return len(documents)
+
+
+def get_index_stats() -> tuple[int, float]:
+    """
+    Return the number of indexed products and their average length
+    """
+    index_stats = cache.get(INDEX_STATS_KEY)
+    if index_stats is None:
+        aggregates = models.SearchDocument.objects.aggregate(
+            count=Count("product"), avg_length=Avg("length")
+        )
+        index_stats = (aggregates["count"], aggregates["avg_length"] or 0)
+        cache.set(INDEX_STATS_KEY, index_stats)
+
+    return index_stats
+
+
+def parse_query(query: str) -> list[list[str]]:
+    """
+    Comma separated terms are alternatives, words inside a term are all required
+    """
+    groups = [tokenize(term) for term in str(query).split(",")]
+    return [group for group in groups if group]
+
+
+def search_products(query: str, operator: str = "or") -> list[tuple[int, float]]:
+    """
+    Return the (product ID, score) pairs matching the query ordered by their
+    BM25 score, every query token matches the indexed terms it is a prefix of
+
+    With the "or" operator products must match any of the comma separated
+    terms, with the "and" operator they must match all of them
+    """
+    groups = parse_query(query)
+    if not groups:
+        return []
+
+    tokens = set(token for group in groups for token in group)
+    postings = models.SearchTerm.objects.filter(
+        reduce(or_, (Q(term__startswith=token) for token in tokens))
+    ).values_list("term", "product", "frequency", "product__search_document__length")
+
+    term_postings = defaultdict(list)
+    for term, product_id, frequency, length in postings:
+        term_postings[term].append((product_id, frequency, length))
+
+    documents_count, avg_length = get_index_stats()
+
+    # Best score of each token for each product
+    token_scores = defaultdict(dict)
+    for term, term_docs in term_postings.items():
+        idf = math.log(
+            1 + (documents_count - len(term_docs) + 0.5) / (len(term_docs) + 0.5)
+        )
+        for product_id, frequency, length in term_docs:
+            norm = K1 * (1 - B + B * (length or 0) / (avg_length or 1))
+            score = idf * frequency * (K1 + 1) / (frequency + norm)
+
+            for token in tokens:
+                if term.startswith(token):
+                    scores = token_scores[product_id]
+                    scores[token] = max(scores.get(token, 0), score)
+
+    match = all if operator == "and" else any
+
+    results = []
+    for product_id, scores in token_scores.items():
+        if match(all(token in scores for token in group) for group in groups):
+            results.append((product_id, sum(scores.values())))
+
+    return sorted(results, key=lambda result: (-result[1], result[0]))
+
+
+def rebuild_search_index():
+    with transaction.atomic():
+        models.SearchTerm.objects.all().delete()
+        models.SearchDocument.objects.all().delete()
+        return index_products()
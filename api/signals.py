@@ -0,0 +1,171 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import autocomplete
+from . import blacklist
+from . import caching
+from . import models
+from . import moderation
+from . import quotas
+from . import rankings
+from . import search
+from . import stats
+from . import votes
+
+
+def is_product_deletion(origin) -> bool:
+    return isinstance(origin, models.Product) or (
+        isinstance(origin, QuerySet) and origin.model is models.Product
+    )
+
+
+@receiver(post_save, sender=models.Product)
+def product_saved(sender, instance: models.Product, created: bool, **kwargs):
+    if created:
+        models.ProductStats.objects.get_or_create(product_id=instance.pk)
+
+    search.index_products([instance.pk])
+    autocomplete.invalidate_index()
+    caching.invalidate_tags(f"product:{instance.pk}", "products")
+
+
+@receiver(post_delete, sender=models.Product)
+def product_deleted(sender, instance: models.Product, **kwargs):
+    autocomplete.invalidate_index()
+    caching.invalidate_tags(f"product:{instance.pk}", "products")
+
+
+@receiver(post_save, sender=models.ProductImage)
+@receiver(post_delete, sender=models.ProductImage)
+def product_image_changed(sender, instance: models.ProductImage, **kwargs):
+    caching.invalidate_tags(f"product:{instance.product_id}")
+
+
+@receiver(post_save, sender=models.Brand)
+def brand_saved(sender, instance: models.Brand, created: bool, **kwargs):
+    if not created:
+        search.index_products(instance.product_set.values_list("id", flat=True))
+
+    autocomplete.invalidate_index()
+    caching.invalidate_tags(f"brand:{instance.pk}", "brands", "products")
+
+
+@receiver(post_delete, sender=models.Brand)
+def brand_deleted(sender, instance: models.Brand, **kwargs):
+    autocomplete.invalidate_index()
+    caching.invalidate_tags(f"brand:{instance.pk}", "brands")
+
+
+@receiver(post_save, sender=models.Category)
+def category_saved(sender, instance: models.Category, created: bool, **kwargs):
+    if not created:
+        search.index_products(instance.product_set.values_list("id", flat=True))
+
+    autocomplete.invalidate_index()
+    caching.invalidate_tags(f"category:{instance.pk}", "categories", "products")
+
+
+@receiver(post_delete, sender=models.Category)
+def category_deleted(sender, instance: models.Category, **kwargs):
+    autocomplete.invalidate_index()
+    caching.invalidate_tags(f"category:{instance.pk}", "categories")
+
+
+@receiver(post_save, sender=models.ProductSpecification)
+@receiver(post_delete, sender=models.ProductSpecification)
+def specification_changed(
+    sender, instance: models.ProductSpecification, origin=None, **kwargs
+):
+    # The index of a deleted product is removed along with it
+    if is_product_deletion(origin):
+        return
+
+    search.index_products([instance.product_id])
+    caching.invalidate_tags(f"product:{instance.product_id}", "products")
+
+
+@receiver(post_save, sender=models.OrderItem)
+def order_item_saved(sender, instance: models.OrderItem, created: bool, **kwargs):
+    if created:
+        stats.record_order_item(instance)
+    else:
+        stats.rebuild_product_stats([instance.product_id])
+
+    transaction.on_commit(rankings.refresh_best_sellers)
+    caching.invalidate_tags(f"product:{instance.product_id}")
+
+
+@receiver(post_delete, sender=models.OrderItem)
+def order_item_deleted(sender, instance: models.OrderItem, **kwargs):
+    stats.record_order_item(instance, sign=-1)
+    transaction.on_commit(rankings.refresh_best_sellers)
+    caching.invalidate_tags(f"product:{instance.product_id}")
+
+
+@receiver(post_save, sender=models.Review)
+def review_saved(sender, instance: models.Review, created: bool, **kwargs):
+    if created:
+        stats.record_review(instance)
+    else:
+        stats.rebuild_product_stats([instance.product_id])
+
+    caching.invalidate_tags(
+        f"product:{instance.product_id}", f"reviews:product:{instance.product_id}"
+    )
+
+
+@receiver(post_delete, sender=models.Review)
+def review_deleted(sender, instance: models.Review, **kwargs):
+    stats.record_review(instance, sign=-1)
+    caching.invalidate_tags(
+        f"product:{instance.product_id}", f"reviews:product:{instance.product_id}"
+    )
+
+
+@receiver(post_save, sender=models.User)
+@receiver(post_delete, sender=models.User)
+def user_changed(sender, instance: models.User, **kwargs):
+    caching.invalidate_tags(f"customer:user:{instance.pk}")
+
+
+@receiver(post_save, sender=models.Customer)
+@receiver(post_delete, sender=models.Customer)
+def customer_changed(sender, instance: models.Customer, **kwargs):
+    caching.invalidate_tags(f"customer:user:{instance.user_id}")
+
+
+@receiver(pre_delete, sender=models.Customer)
+def customer_deleting(sender, instance: models.Customer, **kwargs):
+    # The votes and reports are deleted along with the customer, bypassing
+    # api.votes and api.moderation
+    votes.remove_customer_votes(instance.pk)
+    moderation.remove_customer_reports(instance.pk)
+
+
+@receiver(post_save, sender=models.Coupon)
+@receiver(post_delete, sender=models.Coupon)
+def coupon_changed(sender, instance: models.Coupon, **kwargs):
+    caching.invalidate_tags(f"coupons:customer:{instance.customer_id}")
+
+
+@receiver(post_save, sender=models.Order)
+def order_saved(sender, instance: models.Order, created: bool, **kwargs):
+    # Checkout counts the orders it creates, updates can deliver them
+    if not created and instance.customer_id:
+        quotas.active_orders(instance.customer_id).reset()
+
+
+@receiver(post_delete, sender=models.Order)
+def order_deleted(sender, instance: models.Order, **kwargs):
+    if instance.customer_id:
+        quotas.active_orders(instance.customer_id).reset()
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance: BlacklistedToken, created: bool, **kwargs):
+    # Processes syncing before the commit would not see the new row
+    if created:
+        transaction.on_commit(blacklist.invalidate_blacklist)
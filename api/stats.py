@@ -0,0 +1,119 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import NullIf
+from typing import Iterable
+
+from . import caching
+from . import models
+
+
+def rebuild_product_stats(product_ids: Iterable[int] = None):
+    """
+    Recompute the statistics of the given products (all of them by default)
+    from the order items and reviews tables, expiring their cached responses
+    """
+    products = models.Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=list(product_ids))
+    product_ids = list(products.values_list("id", flat=True))
+
+    sales = {
+        item["product"]: item
+        for item in models.OrderItem.objects.filter(product__in=product_ids)
+        .values("product")
+        .annotate(units=Sum("quantity"), lines=Count("*"))
+        .order_by()
+    }
+    reviews = {
+        item["product"]: item
+        for item in models.Review.objects.filter(product__in=product_ids)
+        .values("product")
+        .annotate(count=Count("id"), rating=Sum("rating"))
+        .order_by()
+    }
+
+    product_stats = []
+    for product_id in product_ids:
+        product_sales = sales.get(product_id, {})
+        product_reviews = reviews.get(product_id, {})
+        review_count = product_reviews.get("count", 0)
+        rating_sum = product_reviews.get("rating") or 0
+
+        product_stats.append(
+            models.ProductStats(
+                product_id=product_id,
+                sold_units=product_sales.get("units", 0),
+                order_lines=product_sales.get("lines", 0),
+                review_count=review_count,
+                rating_sum=rating_sum,
+                rating_avg=rating_sum / review_count if review_count else None,
+            )
+        )
+
+    with transaction.atomic():
+        models.ProductStats.objects.filter(product__in=product_ids).delete()
+        models.ProductStats.objects.bulk_create(product_stats)
+
+    caching.invalidate_tags(*[f"product:{product_id}" for product_id in product_ids])
+
+    return product_stats
+
+
+def get_product_stats(product: models.Product) -> models.ProductStats:
+    try:
+        return product.stats
+    except models.ProductStats.DoesNotExist:
+        product.stats = rebuild_product_stats([product.id])[0]
+        return product.stats
+
+
+def record_order_items(order_items: Iterable[models.OrderItem], sign: int = 1):
+    """
+    Add (or remove with a negative sign) order items to the statistics of
+    their products with a single update
+    """
+    sales = defaultdict(lambda: [0, 0])
+    for order_item in order_items:
+        sales[order_item.product_id][0] += sign * order_item.quantity
+        sales[order_item.product_id][1] += sign
+
+    if not sales:
+        return
+
+    def per_product(index: int) -> Case:
+        return Case(
+            *[
+                When(product=product_id, then=Value(values[index]))
+                for product_id, values in sales.items()
+            ],
+            default=Value(0),
+        )
+
+    models.ProductStats.objects.filter(product__in=sales).update(
+        sold_units=F("sold_units") + per_product(0),
+        order_lines=F("order_lines") + per_product(1),
+    )
+
+
+def record_order_item(order_item: models.OrderItem, sign: int = 1):
+    """
+    Add (or remove with a negative sign) an order item to its product statistics
+    """
+    record_order_items([order_item], sign)
+
+
+def record_review(review: models.Review, sign: int = 1):
+    """
+    Add (or remove with a negative sign) a review to its product statistics
+    """
+    rating = sign * float(review.rating)
+
+    models.ProductStats.objects.filter(product=review.product_id).update(
+        review_count=F("review_count") + sign,
+        rating_sum=F("rating_sum") + rating,
+        rating_avg=(
+            (F("rating_sum") + rating)
+            / NullIf(F("review_count") + sign, 0, output_field=FloatField())
+        ),
+    )
@@ -1,15 +1,57 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import AccessToken
-
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password
-
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+import threading
 import json
 
 from . import models
 from . import utils
 from . import serializers
+from . import rankings
+from . import search
+from . import throttles
+from . import tokens
+from . import autocomplete
+from . import caching
+from . import blacklist
+from . import customer_items
+from . import inventory
+from . import moderation
+from . import quotas
+from . import validators
+from . import votes
+
+
+class ProfanityFilterTest(APITestCase):
+    def test_profanity_filter(self):
+        """
+        Ensure texts containing bad words (as substrings) are rejected
+        """
+        self.assertIsNone(validators.profanity_filter("Very good, i love it"))
+
+        with self.assertRaises(ValidationError):
+            validators.profanity_filter("What a BADASS laptop")
+
+        self.assertTrue(validators.contains_profanity("badass", ["en"]))
+        self.assertFalse(validators.contains_profanity("badass", ["ko"]))
 
 
 class ProductTest(APITestCase):
@@ -60,6 +102,22 @@ class ProductTest(APITestCase):
             msg="Incorrect format of products information",
         )
 
+    def test_order_products(self):
+        """
+        Ensure products can only be sorted by their columns and statistics
+        """
+        products = models.Product.objects.all()
+
+        for order_by, expected in [
+            ("-offer_price", ("-offer_price",)),
+            ("sold", ("stats__order_lines",)),
+            ("orderitem__order__customer__user__password", ()),
+            ("-brand__name", ()),
+        ]:
+            request = mock.Mock(query_params={"order_by": order_by})
+            ordered = utils.order_products(products, request)
+            self.assertEqual(ordered.query.order_by, expected)
+
     def test_retrieve_products(self):
         """
         Ensure anyone can retrieve a specific product by its ID
@@ -74,6 +132,179 @@ class ProductTest(APITestCase):
             msg="Incorrect format of product information",
         )
 
+    def test_product_cache_invalidation(self):
+        """
+        Ensure cached products are served without queries until they change
+        """
+        url = reverse("product-retrieve", kwargs={"product_id": 2})
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data["details"]["offer_price"], "149.00")
+
+        self.product.offer_price = "129.00"
+        self.product.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["details"]["offer_price"], "129.00")
+
+        models.ProductImage.objects.create(
+            url="Other URL", description="Back", product=self.product
+        )
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["images"]), 2)
+
+    def test_product_cache_concurrent_invalidation(self):
+        """
+        Ensure responses computed while their data changes are not cached
+        """
+        cache.clear()
+        url = reverse("product-retrieve", kwargs={"product_id": 2})
+        compose_product = utils.compose_product
+
+        def compose_and_invalidate(product):
+            data = compose_product(product)
+            caching.invalidate_tags(f"product:{product.pk}")
+            return data
+
+        with mock.patch.object(utils, "compose_product", compose_and_invalidate):
+            self.client.get(url)
+
+        with mock.patch.object(
+            utils, "compose_product", wraps=compose_product
+        ) as composed:
+            self.client.get(url)
+        composed.assert_called_once()
+
+    def test_product_cache_timeout(self):
+        """
+        Ensure responses are only kept long when invalidations reach every worker
+        """
+        url = reverse("product-retrieve", kwargs={"product_id": 2})
+
+        for shared, timeout in ((True, 60 * 60 * 24 * 7), (False, 60 * 60)):
+            cache.clear()
+            rankings.get_best_sellers()
+            with mock.patch.object(
+                caching, "is_shared", return_value=shared
+            ), mock.patch.object(caching.cache, "set") as cache_set:
+                self.client.get(url)
+            self.assertIn(
+                timeout,
+                [
+                    call.args[2]
+                    for call in cache_set.call_args_list
+                    if call.args[0].startswith(caching.RESPONSE_KEY_PREFIX)
+                ],
+            )
+
+    def test_compose_products(self):
+        """
+        Ensure products are composed in bulk with a constant number of queries
+        """
+        for n in range(3, 6):
+            product = models.Product.objects.create(
+                id=n,
+                name=f"Motorola G{n}",
+                description="Description",
+                price="199.00",
+                offer_price="149.00",
+                installments=6,
+                stock=100,
+                months_warranty=12,
+                is_gamer=False,
+                brand=self.brand,
+                category=self.category,
+            )
+            models.ProductImage.objects.create(
+                url="URL", description=product.name, product=product, is_default=True
+            )
+
+        products = models.Product.objects.select_related("brand", "category", "stats")
+        rankings.get_best_sellers()
+
+        with self.assertNumQueries(2):
+            composed_products = utils.compose_products(products)
+
+        self.assertEqual(
+            composed_products,
+            [utils.compose_product(p) for p in products],
+            msg="Incorrect format of products information",
+        )
+
+    def test_list_products_by_cursor(self):
+        """
+        Ensure products can be listed page by page using cursors
+        """
+        for n in range(3, 15):
+            product = models.Product.objects.create(
+                id=n,
+                name=f"Motorola G{n}",
+                description="Description",
+                price="199.00",
+                offer_price=f"{100 + n % 4}.00",
+                installments=6,
+                stock=100,
+                months_warranty=12,
+                is_gamer=False,
+                brand=self.brand,
+                category=self.category,
+            )
+            models.ProductImage.objects.create(
+                url="URL", description=product.name, product=product, is_default=True
+            )
+
+        expected_ids = list(
+            models.Product.objects.order_by("offer_price", "id").values_list(
+                "id", flat=True
+            )
+        )
+
+        url = reverse("product-list")
+        response = self.client.get(url, {"cursor": ""})
+        first_page = [p["details"]["id"] for p in response.data["products"]]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(first_page, expected_ids[:10])
+        self.assertIsNone(response.data["previous"])
+
+        response = self.client.get(url, {"cursor": response.data["next"]})
+        second_page = [p["details"]["id"] for p in response.data["products"]]
+
+        self.assertEqual(second_page, expected_ids[10:])
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(url, {"cursor": response.data["previous"]})
+        self.assertEqual(
+            [p["details"]["id"] for p in response.data["products"]], first_page
+        )
+
+        response = self.client.get(url, {"cursor": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(
+        connection.vendor == "postgresql", "--disable-seqscan requires PostgreSQL"
+    )
+    def test_explain_indexes(self):
+        """
+        Ensure the query plans use the indexes, which are kept afterwards
+        """
+        out = StringIO()
+        call_command("explain_indexes", "--disable-seqscan", stdout=out)
+
+        plans = out.getvalue().split("Daily orders quota")[1].split("Product sales")[0]
+        before, after = plans.split("After:")
+        self.assertNotIn("api_order_purchase_date_idx", before)
+        self.assertIn("api_order_purchase_date_idx", after)
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, models.Order._meta.db_table
+            )
+        self.assertIn("api_order_purchase_date_idx", constraints)
+
 
 class BrandAndCategoryTest(APITestCase):
     def setUp(self):
@@ -102,6 +333,75 @@ class BrandAndCategoryTest(APITestCase):
             msg="Incorrect format of serialized brands data",
         )
 
+    def test_throttle_costs(self):
+        """
+        Ensure searches are charged more than cheap listings by the throttle
+        """
+        cache.clear()
+        rates = {
+            "anon-burst": "6/day",
+            "anon-sustained": "100/day",
+            "user-burst": "6/day",
+            "user-sustained": "100/day",
+        }
+
+        with override_settings(
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                "DEFAULT_THROTTLE_RATES": rates,
+            }
+        ):
+            brands_url = reverse("brand-list")
+            search_url = reverse("search-list", kwargs={"search": "hp"})
+            status_codes = [
+                self.client.get(url).status_code
+                for url in (brands_url, brands_url, brands_url, search_url, brands_url)
+            ]
+
+            self.assertEqual(status_codes, [status.HTTP_200_OK] * 4 + [429])
+            self.assertIn("Retry-After", self.client.get(brands_url).headers)
+
+        cache.clear()
+
+    def test_throttle_concurrent_requests(self):
+        """
+        Ensure concurrent requests cannot exceed the limits by losing counts
+        """
+        cache.clear()
+        rates = {"user-burst": "20/day", "user-sustained": "100/day"}
+        request = mock.Mock(user=mock.Mock(is_authenticated=True, pk=1))
+        allowed = []
+
+        with override_settings(
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                "DEFAULT_THROTTLE_RATES": rates,
+            }
+        ):
+            throttle = throttles.UserTieredRateThrottle
+            threads = [
+                threading.Thread(
+                    target=lambda: allowed.append(
+                        throttle().allow_request(request, mock.Mock(spec=[]))
+                    )
+                )
+                for _ in range(50)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # Existing counters are charged with a single increment
+            with mock.patch.object(
+                throttles.cache, "add", wraps=throttles.cache.add
+            ) as cache_add:
+                self.assertFalse(throttle().allow_request(request, mock.Mock(spec=[])))
+            cache_add.assert_not_called()
+
+        self.assertEqual(allowed.count(True), 20)
+        cache.clear()
+
     def test_list_categories(self):
         """
         Ensure anyone can list available categories
@@ -231,10 +531,64 @@ class SearchTest(APITestCase):
                 "categories": serialized_categories.data,
                 "brands": serialized_brands.data,
                 "installments": installments,
+                "facets": {
+                    "categories": {self.category_1.id: 2},
+                    "brands": {self.brand_1.id: 2},
+                    "installments": {12: 2},
+                },
             },
             msg="Incorrect format of search response",
         )
 
+    def test_search_index(self):
+        """
+        Ensure the search index supports prefixes, AND/OR semantics and is
+        updated when products change
+        """
+        results = search.search_products("hp victus 16")
+        self.assertEqual([product_id for product_id, score in results], [2])
+
+        results = search.search_products("samsung,vict")
+        self.assertEqual(sorted(product_id for product_id, score in results), [1, 2, 3])
+        self.assertEqual(search.search_products("samsung,vict", "and"), [])
+
+        self.brand_2.name = "Galaxy"
+        self.brand_2.save()
+        self.product_1.name = "Omen 16"
+        self.product_1.save()
+
+        results = search.search_products("galaxy")
+        self.assertEqual([product_id for product_id, score in results], [3])
+        results = search.search_products("victus")
+        self.assertEqual([product_id for product_id, score in results], [2])
+
+    def test_search_suggestions(self):
+        """
+        Ensure suggestions match the start of any word and favor best sellers
+        """
+        models.ProductStats.objects.filter(product=self.product_2).update(sold_units=5)
+        autocomplete.invalidate_index()
+
+        url = reverse("search-suggest", kwargs={"prefix": "Vic"})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([suggestion["id"] for suggestion in response.data], [2, 1])
+
+        with self.assertNumQueries(0):
+            suggestions = autocomplete.suggest("sams")
+        self.assertEqual(
+            [(suggestion["type"], suggestion["text"]) for suggestion in suggestions],
+            [("brand", "Samsung"), ("product", "Samsung S22")],
+        )
+
+        self.product_3.name = "Galaxy S22"
+        self.product_3.save()
+        self.assertEqual(
+            [suggestion["text"] for suggestion in autocomplete.suggest("gal")],
+            ["Galaxy S22"],
+        )
+
 
 class CustomerTest(APITestCase):
     def setUp(self):
@@ -287,11 +641,14 @@ class CustomerTest(APITestCase):
         Ensure customers can retrieve their account information
         """
 
+        cache.clear()
         url = reverse("customer-retrieve")
-        response = self.client.get(
-            url,
-            **self.headers,
-        )
+        # The authenticated user and its customer, loaded once each
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url,
+                **self.headers,
+            )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(
@@ -300,6 +657,73 @@ class CustomerTest(APITestCase):
             msg="Incorrect format of customer information",
         )
 
+    def test_token_customer_claims(self):
+        """
+        Ensure issued tokens carry the claims used by stateless requests
+        """
+        url = reverse("token_obtain_pair")
+        response = self.client.post(
+            url, {"username": "gotiergod", "password": "ADaska#$99"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access_token = AccessToken(response.data["access"])
+        self.assertEqual(access_token["customer_id"], self.customer.pk)
+        self.assertEqual(access_token["username"], "gotiergod")
+        self.assertFalse(access_token["is_staff"])
+
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['access']}"}
+        url = reverse("customer-list")
+        with self.assertNumQueries(3):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_token_rotation(self):
+        """
+        Ensure rotated refresh tokens are blacklisted and rejected from memory
+        """
+        url = reverse("token_obtain_pair")
+        response = self.client.post(
+            url, {"username": "gotiergod", "password": "ADaska#$99"}
+        )
+        refresh_token = response.data["refresh"]
+
+        url = reverse("token_refresh")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"refresh": refresh_token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data["refresh"], refresh_token)
+
+        # Process-local caches check the table
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {"refresh": refresh_token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with mock.patch.object(caching, "is_shared", return_value=True):
+            blacklist.get_blacklist()
+            with self.assertNumQueries(0):
+                response = self.client.post(url, {"refresh": refresh_token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_tokens(self):
+        """
+        Ensure expired tokens and their blacklist entries are deleted
+        """
+        expired_token = tokens.CustomerRefreshToken.for_user(self.customer.user)
+        expired_token.blacklist()
+        OutstandingToken.objects.filter(jti=expired_token["jti"]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        tokens.CustomerRefreshToken.for_user(self.customer.user)
+
+        call_command("prune_tokens", "--batch-size", "1", stdout=StringIO())
+
+        self.assertFalse(
+            OutstandingToken.objects.filter(jti=expired_token["jti"]).exists()
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+
     def test_update_customer(self):
         """
         Ensure customers can update their account information
@@ -325,6 +749,11 @@ class CustomerTest(APITestCase):
             models.Customer.objects.filter(user__username="godtiergo").exists(),
             msg="The customer was not updated correctly",
         )
+        self.assertEqual(
+            models.User.objects.get(username="godtiergo").first_name,
+            "Iván",
+            msg="The name of the customer was not updated",
+        )
 
     def test_delete_customer(self):
         """
@@ -464,11 +893,41 @@ class CartTest(APITestCase):
             response.data, serialized_products_data, msg="Incorrect list of cart items"
         )
 
+    def test_cart_summary(self):
+        """
+        Ensure customers can get the totals of their cart with the best coupon
+        """
+        models.CartItem.objects.create(product=self.product_2, customer=self.customer)
+        coupon = models.Coupon.objects.create(
+            title="Small Offer", amount="100.00", customer=self.customer
+        )
+        models.Coupon.objects.create(
+            title="Huge Offer", amount="5000.00", customer=self.customer
+        )
+
+        # Tokens with customer claims are served without loading the user
+        access_token = tokens.CustomerRefreshToken.for_user(self.user).access_token
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {access_token}"}
+
+        url = reverse("cart-summary")
+        with self.assertNumQueries(2):
+            response = self.client.get(url, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["offer_price"] for item in response.data["items"]],
+            ["749.00", "949.00"],
+        )
+        self.assertEqual(response.data["subtotal"], "1698.00")
+        self.assertEqual(response.data["cart_discount"], 2)
+        self.assertEqual(response.data["coupon"]["id"], coupon.pk)
+        self.assertEqual(response.data["total"], "1566.04")
+
     def test_create_cart_items(self):
         """
         Ensure customers can add new cart items
         """
-        url = reverse("cart-create", kwargs={"product_id": 2})
+        url = reverse("cart-create", kwargs={"product_ids": [2]})
         response = self.client.post(url, **self.headers)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -477,11 +936,35 @@ class CartTest(APITestCase):
             msg="The cart item was not added",
         )
 
+    def test_create_cart_items_in_bulk(self):
+        """
+        Ensure customers can add several cart items at once within the limit
+        """
+        url = reverse("cart-create", kwargs={"product_ids": [1, 2]})
+        response = self.client.post(url, **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(
+                models.CartItem.objects.filter(customer=self.customer).values_list(
+                    "product", flat=True
+                )
+            ),
+            [1, 2],
+        )
+
+        models.CartItem.objects.filter(product__id=2).delete()
+        with mock.patch.object(customer_items, "CART_ITEMS_LIMIT", 1):
+            response = self.client.post(url, **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(models.CartItem.objects.filter(product__id=2).exists())
+
     def test_move_cart_items_to_favs(self):
         """
         Ensure customers can move their cart items to favorites
         """
-        url = reverse("cart-update", kwargs={"product_id": 1})
+        url = reverse("cart-update", kwargs={"product_ids": [1]})
         response = self.client.patch(url, **self.headers)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -494,6 +977,16 @@ class CartTest(APITestCase):
             msg="The cart item was not moved",
         )
 
+        # Products missing from the cart are not moved
+        url = reverse("cart-update", kwargs={"product_ids": [self.product_2.pk]})
+        response = self.client.patch(url, **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            models.FavItem.objects.filter(product=self.product_2).exists(),
+            msg="A product missing from the cart was added to favorites",
+        )
+
     def test_delete_cart_items(self):
         """
         Ensure customers can remove their cart items
@@ -619,7 +1112,7 @@ class FavoritesTest(APITestCase):
         """
         Ensure customers can add new favorites
         """
-        url = reverse("favorites-create", kwargs={"product_id": 2})
+        url = reverse("favorites-create", kwargs={"product_ids": [2]})
         response = self.client.post(url, **self.headers)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -632,7 +1125,7 @@ class FavoritesTest(APITestCase):
         """
         Ensure customers can move their favorites to cart
         """
-        url = reverse("favorites-update", kwargs={"product_id": 1})
+        url = reverse("favorites-update", kwargs={"product_ids": [1]})
         response = self.client.patch(url, **self.headers)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -661,6 +1154,9 @@ class FavoritesTest(APITestCase):
 
 class PurchaseTest(APITestCase):
     def setUp(self):
+        # Quota counters and rankings would leak from other tests
+        cache.clear()
+
         self.user = models.User.objects.create(
             username="gotiergod",
             email="gotiergod@gmail.com",
@@ -800,6 +1296,98 @@ class PurchaseTest(APITestCase):
             3,
             msg="Incorrect quantity of order items created",
         )
+        self.assertEqual(
+            response.data["order"]["paid"],
+            "2300.06",
+            msg="The coupon and cart discount were not applied",
+        )
+        self.assertEqual(len(response.data["order_items"]), 2)
+        self.assertFalse(models.Coupon.objects.filter(pk=self.coupon.pk).exists())
+        self.assertEqual(
+            models.ProductStats.objects.get(product=self.product_1).sold_units, 3
+        )
+        self.assertEqual(models.Product.objects.get(pk=self.product_1.pk).stock, 48)
+
+    def test_create_purchase_out_of_stock(self):
+        """
+        Ensure products cannot be purchased beyond their stock
+        """
+        models.Product.objects.filter(pk=self.product_2.pk).update(stock=1)
+        data = {
+            "products": [
+                {"id": self.product_1.pk, "quantity": 1},
+                {"id": self.product_2.pk, "quantity": 2},
+            ],
+            "payment_method": "Visa",
+            "country": "Country",
+            "city": "City",
+            "address": "Address",
+            "notes": "Nothing",
+        }
+
+        url = reverse("purchase-create")
+        response = self.client.post(
+            url,
+            data=json.dumps(data),
+            content_type="application/json",
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["products"], [self.product_2.pk])
+        self.assertEqual(models.Order.objects.all().count(), 1)
+        self.assertEqual(models.Product.objects.get(pk=self.product_1.pk).stock, 50)
+
+    def test_active_orders_quota(self):
+        """
+        Ensure customers cannot have more than 3 active orders at once
+        """
+        data = {
+            "products": [{"id": self.product_1.pk, "quantity": 1}],
+            "payment_method": "Visa",
+            "country": "Country",
+            "city": "City",
+            "address": "Address",
+            "notes": "Nothing",
+        }
+
+        url = reverse("purchase-create")
+        responses = [
+            self.client.post(
+                url,
+                data=json.dumps(data),
+                content_type="application/json",
+                **self.headers,
+            )
+            for _ in range(3)
+        ]
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_403_FORBIDDEN],
+        )
+        self.assertEqual(models.Order.objects.filter(customer=self.customer).count(), 3)
+
+        self.order.delivered = True
+        self.order.save()
+
+        response = self.client.post(
+            url,
+            data=json.dumps(data),
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Seeded counters are acquired without counting the orders again
+        with mock.patch.object(caching, "is_shared", return_value=True):
+            self.assertFalse(quotas.active_orders(self.customer.pk).acquire())
+            with self.assertNumQueries(0):
+                self.assertFalse(quotas.active_orders(self.customer.pk).acquire())
+
+        # Process-local counters are not used
+        with self.assertNumQueries(1):
+            self.assertFalse(quotas.active_orders(self.customer.pk).acquire())
 
     def test_update_purchase(self):
         """
@@ -838,20 +1426,100 @@ class PurchaseTest(APITestCase):
             models.Order.objects.filter(pk=self.order.pk).exists(),
             msg="The order was not deleted",
         )
+        self.assertFalse(
+            models.OrderItem.objects.filter(pk=self.order_item.pk).exists(),
+            msg="The order items were not deleted",
+        )
+        self.assertEqual(
+            models.Product.objects.get(pk=self.product_1.pk).stock,
+            51,
+            msg="The stock was not released",
+        )
 
     def test_list_history(self):
         """
         Ensure customers can list their purchase history
         """
+        order_item = models.OrderItem.objects.create(
+            quantity=1,
+            product=models.Product.objects.get(pk=self.product_2.pk),
+            order=models.Order.objects.create(
+                paid=self.product_2.offer_price,
+                payment_method="Visa",
+                delivery_term="2023-09-12",
+                country=self.customer.country,
+                city=self.customer.city,
+                address=self.customer.address,
+                customer=self.customer,
+            ),
+        )
+        models.Review.objects.create(
+            customer=self.customer, product=self.product_2, rating=5, content="Good"
+        )
+
+        # Computed on the first read, as the refreshes run after the commit
+        rankings.get_best_sellers()
+
         url = reverse("history-list")
-        response = self.client.get(url, **self.headers)
+        with self.assertNumQueries(7):
+            response = self.client.get(url, **self.headers)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], 2)
         self.assertEqual(
-            response.data,
-            [utils.compose_purchase(self.order_item)],
+            response.data["orders"],
+            [
+                {
+                    "order": purchase["order"],
+                    "purchases": [
+                        {
+                            key: value
+                            for key, value in purchase.items()
+                            if key != "order"
+                        }
+                    ],
+                }
+                for purchase in [
+                    utils.compose_purchase(order_item),
+                    utils.compose_purchase(self.order_item),
+                ]
+            ],
             msg="Incorrect format of purchases information",
         )
+        self.assertTrue(response.data["orders"][0]["purchases"][0]["is_reviewed"])
+
+    def test_best_sellers_ranking(self):
+        """
+        Ensure the best sellers ranking is refreshed when order item writes are
+        committed and answered without querying the database
+        """
+        version, best_sellers = rankings.get_best_sellers_ranking()
+        self.assertIn(self.product_1.pk, best_sellers)
+        self.assertNotIn(self.product_2.pk, best_sellers)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order_item = models.OrderItem.objects.create(
+                quantity=1, product=self.product_2, order=self.order
+            )
+
+        with self.assertNumQueries(0):
+            new_version, best_sellers = rankings.get_best_sellers_ranking()
+            self.assertTrue(utils.is_best_seller(self.product_2))
+
+        self.assertGreater(new_version, version)
+        self.assertIn(self.product_2.pk, best_sellers)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order_item.delete()
+        self.assertFalse(utils.is_best_seller(self.product_2))
+
+        # Other workers only see the refresh once their local copy expires
+        with mock.patch.object(caching, "is_shared", return_value=False):
+            with mock.patch.object(rankings.cache, "set") as cache_set:
+                rankings.refresh_best_sellers()
+        self.assertEqual(
+            cache_set.call_args.args[2], rankings.BEST_SELLERS_LOCAL_TIMEOUT
+        )
 
     def test_retrieve_history(self):
         """
@@ -868,6 +1536,60 @@ class PurchaseTest(APITestCase):
         )
 
 
+class StockReservationTest(TransactionTestCase):
+    def setUp(self):
+        brand = models.Brand.objects.create(
+            name="HP", description="Description", website_url="URL", logo_url="Logo"
+        )
+        category = models.Category.objects.create(
+            title="Laptops", description="Description", icon="Icon"
+        )
+        self.product = models.Product.objects.create(
+            name="HP Victus 15",
+            description="Description",
+            price="849.00",
+            offer_price="749.00",
+            installments=12,
+            stock=5,
+            months_warranty=24,
+            brand=brand,
+            category=category,
+        )
+
+    @skipUnless(
+        connection.vendor == "postgresql", "select_for_update requires PostgreSQL"
+    )
+    def test_concurrent_reservations(self):
+        """
+        Ensure concurrent checkouts never sell more units than available
+        """
+        results = []
+        barrier = threading.Barrier(20)
+
+        def checkout():
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    inventory.reserve_stock(
+                        [models.OrderItem(product_id=self.product.pk, quantity=1)]
+                    )
+                results.append(True)
+            except inventory.OutOfStock:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(results.count(False), 15)
+        self.assertEqual(models.Product.objects.get(pk=self.product.pk).stock, 0)
+
+
 class ReviewTest(APITestCase):
     def setUp(self):
         self.user = models.User.objects.create(
@@ -985,8 +1707,12 @@ class ReviewTest(APITestCase):
         """
         Ensure anyone can list products reviews
         """
+        votes.toggle_vote(models.ReviewLike, self.review.pk, self.customer.pk)
+        self.review.refresh_from_db()
+
         url = reverse("reviews-list", kwargs={"product_id": self.product_1.pk})
-        response = self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(
@@ -994,6 +1720,59 @@ class ReviewTest(APITestCase):
             [utils.compose_review(self.review)],
             msg="Incorrect format of review information",
         )
+        self.assertEqual(response.data[0]["likes"], 1)
+
+    def test_product_stats(self):
+        """
+        Ensure product statistics are kept current by order items and reviews
+        and can be rebuilt from scratch
+        """
+        models.OrderItem.objects.create(
+            quantity=3,
+            product=models.Product.objects.get(pk=self.product_1.pk),
+            order=self.order,
+        )
+        review = models.Review.objects.create(
+            rating=2.5,
+            content="Not so good as i expected",
+            customer=self.customer,
+            product=self.product_2,
+        )
+        models.Review.objects.create(
+            rating=3.5,
+            content="Good enough for the price",
+            customer=models.Customer.objects.create(
+                birthdate="2000-02-02",
+                user=models.User.objects.create(username="otheruser"),
+            ),
+            product=self.product_2,
+        )
+
+        product_stats = models.ProductStats.objects.get(product=self.product_1)
+        self.assertEqual(product_stats.sold_units, 4)
+        self.assertEqual(product_stats.order_lines, 2)
+        self.assertEqual(product_stats.review_count, 1)
+        self.assertEqual(product_stats.rating_avg, 4.5)
+
+        review.delete()
+        product_stats = models.ProductStats.objects.get(product=self.product_2)
+        self.assertEqual(product_stats.review_count, 1)
+        self.assertEqual(product_stats.rating_avg, 3.5)
+
+        # The drifted statistics get cached, rebuilding them expires the cache
+        url = reverse("product-retrieve", kwargs={"product_id": self.product_1.pk})
+        models.ProductStats.objects.filter(product=self.product_1).update(
+            sold_units=0, order_lines=7, review_count=0
+        )
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).data["sold"], 7)
+
+        call_command("rebuild_product_stats", stdout=StringIO())
+
+        product_stats = models.ProductStats.objects.get(product=self.product_1)
+        self.assertEqual(product_stats.sold_units, 4)
+        self.assertEqual(product_stats.review_count, 1)
+        self.assertEqual(self.client.get(url).data["sold"], 2)
 
     def test_create_reviews(self):
         """
@@ -1065,6 +1844,135 @@ class ReviewTest(APITestCase):
             msg="The like was not added",
         )
 
+        url = reverse("reviews-dislike", kwargs={"review_id": self.review.pk})
+        response = self.client.patch(url, **self.headers)
+
+        self.review.refresh_from_db()
+        self.assertEqual(
+            (self.review.likes_count, self.review.dislikes_count),
+            (0, 1),
+            msg="The dislike did not replace the like",
+        )
+        self.assertFalse(models.ReviewLike.objects.filter(review=self.review).exists())
+
+        response = self.client.patch(url, **self.headers)
+
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.likes_count, self.review.dislikes_count), (0, 0))
+
+    def test_toggle_vote_queries(self):
+        """
+        Ensure toggling a vote only touches the vote rows and the counters
+        """
+        # Including the savepoint wrapping the writes
+        with self.assertNumQueries(5):
+            votes.toggle_vote(models.ReviewLike, self.review.pk, self.customer.pk)
+
+        with self.assertNumQueries(6):
+            votes.toggle_vote(models.ReviewDislike, self.review.pk, self.customer.pk)
+
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.likes_count, self.review.dislikes_count), (0, 1))
+
+    def test_delete_voter_account(self):
+        """
+        Ensure the votes of deleted accounts are discounted from the reviews
+        """
+        other_user = models.User.objects.create(username="otheruser")
+        other_customer = models.Customer.objects.create(
+            birthdate="2000-02-02", user=other_user
+        )
+        votes.toggle_vote(models.ReviewLike, self.review.pk, other_customer.pk)
+        votes.toggle_vote(models.ReviewDislike, self.review.pk, self.customer.pk)
+
+        other_customer.delete()
+
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.likes_count, self.review.dislikes_count), (0, 1))
+
+    def test_list_scoped_interactions(self):
+        """
+        Ensure customers can list their interactions with some reviews, only
+        those made after a given date if requested
+        """
+        votes.toggle_vote(models.ReviewLike, self.review.pk, self.customer.pk)
+
+        url = reverse(
+            "customer-interactions-reviews",
+            kwargs={"review_ids": [self.review.pk, self.review.pk + 1]},
+        )
+        response = self.client.get(url, **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["likes"], [self.review.pk])
+        self.assertEqual(response.data["dislikes"], [])
+
+        url = reverse(
+            "customer-interactions-product", kwargs={"product_id": self.product_1.pk}
+        )
+        response = self.client.get(url, **self.headers)
+        self.assertEqual(response.data["likes"], [self.review.pk])
+
+        timestamp = response.data["timestamp"]
+        other_customer = models.Customer.objects.create(
+            birthdate="2000-02-02",
+            phone="Phone",
+            country="Country",
+            city="City",
+            address="Address",
+            user=models.User.objects.create(username="otheruser"),
+        )
+        review_2 = models.Review.objects.create(
+            customer=other_customer, product=self.product_1, rating=4, content="Decent"
+        )
+        votes.toggle_vote(models.ReviewLike, review_2.pk, self.customer.pk)
+
+        response = self.client.get(
+            url, {"since": timestamp.isoformat()}, **self.headers
+        )
+        self.assertEqual(
+            (response.data["likes"], response.data["full"]), ([review_2.pk], False)
+        )
+
+        # Replacing the like leaves no row behind, all the interactions are sent
+        timestamp = response.data["timestamp"]
+        with self.captureOnCommitCallbacks(execute=True):
+            votes.toggle_vote(models.ReviewDislike, self.review.pk, self.customer.pk)
+
+        response = self.client.get(
+            url, {"since": timestamp.isoformat()}, **self.headers
+        )
+        self.assertEqual(
+            (response.data["likes"], response.data["dislikes"], response.data["full"]),
+            ([review_2.pk], [self.review.pk], True),
+        )
+
+        response = self.client.get(url, {"since": "yesterday"}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reconcile_review_votes(self):
+        """
+        Ensure drifted vote counters can be repaired
+        """
+        models.ReviewLike.objects.create(review=self.review, customer=self.customer)
+        models.Review.objects.filter(pk=self.review.pk).update(
+            dislikes_count=3, reports_count=2
+        )
+
+        output = StringIO()
+        call_command("reconcile_review_votes", stdout=output)
+
+        self.assertIn("Fixed vote counters of 1 reviews.", output.getvalue())
+        self.review.refresh_from_db()
+        self.assertEqual(
+            (
+                self.review.likes_count,
+                self.review.dislikes_count,
+                self.review.reports_count,
+            ),
+            (1, 0, 0),
+        )
+
     def test_dislike_reviews(self):
         """
         Ensure customers can dislike reviews
@@ -1093,6 +2001,43 @@ class ReviewTest(APITestCase):
             msg="The report was not added",
         )
 
+        response = self.client.patch(url, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(REVIEW_REPORT_THRESHOLD=2)
+    def test_report_threshold(self):
+        """
+        Ensure reviews are hidden once they reach the report threshold
+        """
+        other_user = models.User.objects.create(
+            username="otheruser",
+            email="otheruser@gmail.com",
+            password=make_password("ADaska#$99"),
+        )
+        other_customer = models.Customer.objects.create(
+            birthdate="2000-02-02", user=other_user
+        )
+
+        self.assertFalse(moderation.report_review(self.review.pk, self.customer.pk))
+        self.assertTrue(moderation.report_review(self.review.pk, other_customer.pk))
+
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.reports_count, 2)
+        self.assertTrue(self.review.hidden, msg="The review was not hidden")
+
+        url = reverse("reviews-list", kwargs={"product_id": self.product_1.pk})
+        self.assertEqual(self.client.get(url).data, [])
+
+        # Falling back below the threshold shows the review again
+        other_customer.delete()
+
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.reports_count, self.review.hidden), (1, False))
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+        moderation.set_hidden(models.Review.objects.filter(pk=self.review.pk), True)
+        self.assertEqual(self.client.get(url).data, [])
+
 
 class CouponTest(APITestCase):
     def setUp(self):
@@ -1135,3 +2080,28 @@ class CouponTest(APITestCase):
             ).data,
             msg="Incorrect format of coupons information",
         )
+
+    def test_coupons_cache(self):
+        """
+        Ensure cached coupons are kept per customer and refreshed when they change
+        """
+        other_user = models.User.objects.create(
+            username="otheruser",
+            email="otheruser@gmail.com",
+            password=make_password("ADaska#$99"),
+        )
+        models.Customer.objects.create(birthdate="2000-02-02", user=other_user)
+        other_headers = {
+            "HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(other_user)}"
+        }
+
+        url = reverse("coupons-list")
+        self.assertEqual(len(self.client.get(url, **self.headers).data), 1)
+        self.assertEqual(len(self.client.get(url, **other_headers).data), 0)
+
+        self.coupon.delete()
+
+        response = self.client.get(url, **self.headers)
+        self.assertEqual(
+            response.data, [], msg="Stale coupons were served from the cache"
+        )
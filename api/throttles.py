@@ -1,17 +1,175 @@
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+import math
+import time
 
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCacheClient
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
 
-class AnonBurstRateThrottle(AnonRateThrottle):
-    scope = "anon-burst"
+DURATIONS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
 
 
-class AnonSustainedRateThrottle(AnonRateThrottle):
-    scope = "anon-sustained"
+def parse_rate(rate: str) -> tuple[int, int]:
+    """
+    Return the (number of requests, duration in seconds) of a rate like "3600/day"
+    """
+    num, period = rate.split("/")
+    return int(num), DURATIONS[period[0]]
 
 
-class UserBurstRateThrottle(UserRateThrottle):
-    scope = "user-burst"
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Throttle every client by several rate tiers (e.g. burst and sustained)
 
+    Each tier counts the requests of the current and previous fixed windows,
+    the previous one weighted by how much of it the sliding window still
+    covers, so a tier only stores two integers per client no matter its rate.
+    The current counters are charged with atomic increments, so concurrent
+    requests cannot lose each other's counts
 
-class UserSustainedRateThrottle(UserRateThrottle):
-    scope = "user-sustained"
+    Views can set a throttle_cost, either a number or a dict of costs by
+    action, to charge expensive requests more than cheap ones
+    """
+
+    cache = cache
+    cache_format = "throttle:%(scope)s:%(ident)s:%(window)s"
+    scopes = ()
+
+    def __init__(self):
+        self.tiers = [
+            (scope, *parse_rate(api_settings.DEFAULT_THROTTLE_RATES[scope]))
+            for scope in self.scopes
+        ]
+        self.wait_time = None
+
+    def get_cache_ident(self, request) -> str:
+        """
+        Identify the client, or return None to skip the throttle
+        """
+        raise NotImplementedError(".get_cache_ident() must be overridden")
+
+    def get_cost(self, view) -> int:
+        cost = getattr(view, "throttle_cost", 1)
+        if isinstance(cost, dict):
+            cost = cost.get(getattr(view, "action", None), 1)
+
+        return cost
+
+    def allow_request(self, request, view) -> bool:
+        ident = self.get_cache_ident(request)
+        if ident is None or not self.tiers:
+            return True
+
+        now = time.time()
+        cost = self.get_cost(view)
+
+        windows = []
+        for scope, limit, duration in self.tiers:
+            window = int(now // duration)
+            current_key, previous_key = (
+                self.cache_format % {"scope": scope, "ident": ident, "window": w}
+                for w in (window, window - 1)
+            )
+            elapsed = (now - window * duration) / duration
+            windows.append((limit, duration, current_key, previous_key, elapsed))
+
+        counts = self.charge(windows, cost)
+
+        for (limit, duration, _, _, elapsed), (current, previous) in zip(
+            windows, counts
+        ):
+            if previous * (1 - elapsed) + current > limit:
+                # Rejected requests are not counted
+                for window in windows:
+                    try:
+                        self.cache.decr(window[2], cost)
+                    except ValueError:
+                        pass
+
+                self.wait_time = self.get_wait(
+                    limit, duration, current - cost, previous, elapsed, cost
+                )
+                return False
+
+        return True
+
+    def charge(self, windows: list, cost: int) -> list[tuple[int, int]]:
+        """
+        Charge the cost to the current counter of every tier, returning the
+        (current, previous) counts of each one
+
+        Redis is sent every read and increment in a single round trip
+        """
+        backend = getattr(self.cache, "_cache", None)
+        if isinstance(backend, RedisCacheClient):
+            return self.charge_pipelined(backend, windows, cost)
+
+        previous_counts = self.cache.get_many([window[3] for window in windows])
+
+        counts = []
+        for _, duration, current_key, previous_key, _ in windows:
+            try:
+                current = self.cache.incr(current_key, cost)
+            except ValueError:
+                # The counter is read as the previous window during the next
+                # one, it is created unless a concurrent request did it first
+                if self.cache.add(current_key, cost, duration * 2):
+                    current = cost
+                else:
+                    current = self.cache.incr(current_key, cost)
+            counts.append((current, previous_counts.get(previous_key, 0)))
+
+        return counts
+
+    def charge_pipelined(
+        self, backend: RedisCacheClient, windows: list, cost: int
+    ) -> list[tuple[int, int]]:
+        with backend.get_client(write=True).pipeline(transaction=False) as pipe:
+            for _, duration, current_key, previous_key, _ in windows:
+                current_key = self.cache.make_and_validate_key(current_key)
+                pipe.set(current_key, 0, ex=duration * 2, nx=True)
+                pipe.incrby(current_key, cost)
+                pipe.get(self.cache.make_and_validate_key(previous_key))
+            results = pipe.execute()
+
+        # Every tier queued a SET, an INCRBY and a GET
+        return [
+            (current, int(previous or 0))
+            for current, previous in zip(results[1::3], results[2::3])
+        ]
+
+    def get_wait(self, limit, duration, current, previous, elapsed, cost) -> float:
+        """
+        Seconds until the weight of the previous window decays enough, or
+        until the next window when the current one is already full
+        """
+        excess = previous * (1 - elapsed) + current + cost - limit
+        remaining = (1 - elapsed) * duration
+
+        if previous and excess <= previous * (1 - elapsed):
+            return math.ceil(excess / previous * duration)
+
+        return math.ceil(remaining)
+
+    def wait(self):
+        return self.wait_time
+
+
+class AnonTieredRateThrottle(SlidingWindowRateThrottle):
+    scopes = ("anon-burst", "anon-sustained")
+
+    def get_cache_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return None
+
+        return self.get_ident(request)
+
+
+class UserTieredRateThrottle(SlidingWindowRateThrottle):
+    scopes = ("user-burst", "user-sustained")
+
+    def get_cache_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+
+        return None
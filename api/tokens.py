@@ -0,0 +1,61 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import blacklist
+from . import models
+
+
+class CustomerRefreshToken(RefreshToken):
+    """
+    Refresh token embedding the claims needed to serve stateless requests,
+    the access tokens and rotated refresh tokens derived from it keep them
+    """
+
+    @classmethod
+    def for_user(cls, user: models.User):
+        token = super().for_user(user)
+
+        token["customer_id"] = (
+            models.Customer.objects.filter(user=user)
+            .values_list("id", flat=True)
+            .first()
+        )
+        token["username"] = user.username
+        token["is_staff"] = user.is_staff
+
+        return token
+
+    def check_blacklist(self):
+        # Checked against the blacklist kept in memory instead of the table
+        if blacklist.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class CustomerTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CustomerRefreshToken
+
+
+class CustomerTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CustomerRefreshToken
+
+
+class CustomerTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = CustomerRefreshToken
+
+
+class CustomerTokenUser(TokenUser):
+    """
+    User built from the claims of a token, without touching the database
+    """
+
+    @property
+    def customer_id(self) -> int:
+        return self.token.get("customer_id")
@@ -24,6 +24,11 @@ urlpatterns = [
         name="category-list",
     ),
     # Search
+    path(
+        "search/suggest/<str:prefix>",
+        views.SearchViewSet.as_view({"get": "suggest"}),
+        name="search-suggest",
+    ),
     path(
         "search/<str:search>",
         views.SearchViewSet.as_view({"get": "list"}),
@@ -55,10 +60,25 @@ urlpatterns = [
         views.CustomerViewSet.as_view({"get": "list"}),
         name="customer-list",
     ),
+    path(
+        "customer/interactions/product/<int:product_id>",
+        views.CustomerViewSet.as_view({"get": "interactions"}),
+        name="customer-interactions-product",
+    ),
+    path(
+        "customer/interactions/reviews/<intlist:review_ids>",
+        views.CustomerViewSet.as_view({"get": "interactions"}),
+        name="customer-interactions-reviews",
+    ),
     # Cart
     path("cart/", views.CartItemViewSet.as_view({"get": "list"}), name="cart-list"),
     path(
-        "cart/create/<int:product_id>",
+        "cart/summary/",
+        views.CartItemViewSet.as_view({"get": "summary"}),
+        name="cart-summary",
+    ),
+    path(
+        "cart/create/<intlist:product_ids>",
         views.CartItemViewSet.as_view({"post": "create"}),
         name="cart-create",
     ),
@@ -68,7 +88,7 @@ urlpatterns = [
         name="cart-delete",
     ),
     path(
-        "cart/move/<int:product_id>",
+        "cart/move/<intlist:product_ids>",
         views.CartItemViewSet.as_view({"patch": "update"}),
         name="cart-update",
     ),
@@ -79,7 +99,7 @@ urlpatterns = [
         name="favorites-list",
     ),
     path(
-        "favorites/create/<int:product_id>",
+        "favorites/create/<intlist:product_ids>",
         views.FavItemViewSet.as_view({"post": "create"}),
         name="favorites-create",
     ),
@@ -89,7 +109,7 @@ urlpatterns = [
         name="favorites-delete",
     ),
     path(
-        "favorites/move/<int:product_id>",
+        "favorites/move/<intlist:product_ids>",
         views.FavItemViewSet.as_view({"patch": "update"}),
         name="favorites-update",
     ),
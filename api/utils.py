@@ -1,10 +1,15 @@
 from rest_framework.response import Response
-from django.db.models import Avg, Count, Sum
+from django.db.models import Count, prefetch_related_objects
 from rest_framework.request import Request
 from django.db.models.manager import BaseManager
+from typing import Iterable
+from decimal import Decimal
+from datetime import datetime
 
 from . import serializers
 from . import models
+from . import rankings
+from . import stats
 
 from distutils.util import strtobool
 
@@ -27,6 +32,8 @@ def compose_customer(customer: models.Customer):
 
 
 def compose_product(product: models.Product):
+    product_stats = stats.get_product_stats(product)
+
     return {
         "details": serializers.ProductSerializer(product).data,
         "default_img": serializers.ProductImageSerializer(
@@ -36,12 +43,140 @@ def compose_product(product: models.Product):
             models.ProductImage.objects.filter(product=product),
             many=True,
         ).data,
-        "sold": models.OrderItem.objects.filter(product=product).count(),
+        "sold": product_stats.order_lines,
         "best_seller": is_best_seller(product),
-        "reviews_counter": models.Review.objects.filter(product=product).count(),
-        "rating": models.Review.objects.filter(product=product).aggregate(
-            Avg("rating")
-        )["rating__avg"],
+        "reviews_counter": product_stats.review_count,
+        "rating": product_stats.rating_avg,
+    }
+
+
+def compose_products(products: Iterable[models.Product]):
+    """
+    Bulk version of compose_product, the output for each product is the same
+    but images and statistics are loaded for all the products at once, so the
+    number of queries does not grow with the number of products
+    """
+    products = list(products)
+    if not products:
+        return []
+
+    prefetch_related_objects(products, "brand", "category", "stats")
+    product_ids = [p.id for p in products]
+    products_by_id = {p.id: p for p in products}
+
+    missing_stats = [p.id for p in products if not hasattr(p, "stats")]
+    if missing_stats:
+        for product_stats in stats.rebuild_product_stats(missing_stats):
+            products_by_id[product_stats.product_id].stats = product_stats
+
+    images = {product_id: [] for product_id in product_ids}
+    for image in models.ProductImage.objects.filter(product__in=product_ids):
+        # Avoid an extra query per image when serializing its product name
+        image.product = products_by_id[image.product_id]
+        images[image.product_id].append(image)
+
+    bs_products = rankings.get_best_sellers()
+
+    composed_products = []
+    for product in products:
+        default_images = [img for img in images[product.id] if img.is_default]
+        if not default_images:
+            raise models.ProductImage.DoesNotExist(
+                "ProductImage matching query does not exist."
+            )
+
+        composed_products.append(
+            {
+                "details": serializers.ProductSerializer(product).data,
+                "default_img": serializers.ProductImageSerializer(
+                    default_images[0]
+                ).data,
+                "images": serializers.ProductImageSerializer(
+                    images[product.id],
+                    many=True,
+                ).data,
+                "sold": product.stats.order_lines,
+                "best_seller": product.id in bs_products,
+                "reviews_counter": product.stats.review_count,
+                "rating": product.stats.rating_avg,
+            }
+        )
+
+    return composed_products
+
+
+def compose_facets(products: BaseManager[models.Product]):
+    """
+    Distinct categories, brands and installments of the given products with
+    the number of products having each of them, computed by the database
+    """
+    categories = (
+        models.Category.objects.filter(product__in=products)
+        .annotate(hits=Count("product"))
+        .order_by("id")
+    )
+    brands = (
+        models.Brand.objects.filter(product__in=products)
+        .annotate(hits=Count("product"))
+        .order_by("id")
+    )
+    installments = (
+        products.values_list("installments")
+        .annotate(hits=Count("id"))
+        .order_by("installments")
+    )
+
+    return {
+        "categories": categories,
+        "brands": brands,
+        "installments": dict(installments),
+    }
+
+
+def cart_discount_rate(items_count: int) -> int:
+    """
+    Purchases of several products get a discount of one percent per product
+    """
+    return items_count if items_count > 1 else 0
+
+
+def compute_total(subtotal: Decimal, items_count: int, coupon: models.Coupon = None):
+    """
+    Apply the coupon and then the cart discount to the subtotal of a purchase
+    """
+    total = subtotal - coupon.amount if coupon else subtotal
+
+    return total - total * cart_discount_rate(items_count) / 100
+
+
+def compose_cart_summary(cart_lines: list[dict], coupons: Iterable[models.Coupon]):
+    """
+    Prices of the cart products, given as the values of their cart items, and
+    the totals a purchase of the whole cart would pay with its best coupon,
+    amounts are formatted as strings like the serializers do
+    """
+    subtotal = sum((line["product__offer_price"] for line in cart_lines), Decimal(0))
+    coupon = max(
+        (coupon for coupon in coupons if coupon.amount <= subtotal),
+        key=lambda coupon: coupon.amount,
+        default=None,
+    )
+    total = compute_total(subtotal, len(cart_lines), coupon)
+
+    return {
+        "items": [
+            {
+                "product": line["product"],
+                "name": line["product__name"],
+                "price": str(line["product__price"]),
+                "offer_price": str(line["product__offer_price"]),
+            }
+            for line in cart_lines
+        ],
+        "subtotal": str(subtotal),
+        "cart_discount": cart_discount_rate(len(cart_lines)),
+        "coupon": serializers.CouponSerializer(coupon).data if coupon else None,
+        "total": str(total.quantize(Decimal("0.01"))),
     }
 
 
@@ -56,14 +191,109 @@ def compose_purchase(order_item: models.OrderItem):
     }
 
 
+def compose_history(orders: Iterable[models.Order]):
+    """
+    Group the purchases of the given orders, which must belong to the same
+    customer, loading their products and review status at once
+    """
+    orders = list(orders)
+    if not orders:
+        return []
+
+    order_items = list(
+        models.OrderItem.objects.filter(order__in=orders)
+        .select_related("product__brand", "product__category", "product__stats")
+        .order_by("id")
+    )
+    composed_products = compose_products([item.product for item in order_items])
+    reviewed_products = set(
+        models.Review.objects.filter(
+            customer=orders[0].customer_id,
+            product__in=[item.product_id for item in order_items],
+        ).values_list("product", flat=True)
+    )
+
+    orders_by_id = {order.id: order for order in orders}
+    purchases = {order.id: [] for order in orders}
+    for order_item, composed_product in zip(order_items, composed_products):
+        order_item.order = orders_by_id[order_item.order_id]
+        purchases[order_item.order_id].append(
+            {
+                "order_item": serializers.OrderItemSerializer(order_item).data,
+                "product": composed_product,
+                "is_reviewed": order_item.product_id in reviewed_products,
+            }
+        )
+
+    return [
+        {
+            "order": serializers.OrderSerializer(order).data,
+            "purchases": purchases[order.id],
+        }
+        for order in orders
+    ]
+
+
 def compose_review(review: models.Review):
     return {
         "review": serializers.ReviewSerializer(review).data,
-        "likes": models.ReviewLike.objects.filter(review=review).count(),
-        "dislikes": models.ReviewDislike.objects.filter(review=review).count(),
+        "likes": review.likes_count,
+        "dislikes": review.dislikes_count,
     }
 
 
+def compose_reviews(reviews: Iterable[models.Review]):
+    """
+    Compose many reviews, load them with select_related("customer__user",
+    "product") so serializing them runs no extra queries
+    """
+    return [compose_review(review) for review in reviews]
+
+
+def compose_interactions(
+    customer_id: int,
+    review_ids: Iterable[int] = None,
+    product_id: int = None,
+    since: datetime = None,
+):
+    """
+    IDs of the reviews liked, disliked and reported by the customer, only
+    among the given reviews or the reviews of the given product if any, and
+    only the interactions made after the since date if given
+
+    Withdrawn votes leave no row behind, so when the customer withdrew any
+    after the since date all the interactions are returned instead, which
+    is flagged by "full"
+    """
+    interactions = {}
+    if since is not None:
+        removed_at = (
+            models.Customer.objects.filter(id=customer_id)
+            .values_list("interactions_removed_at", flat=True)
+            .first()
+        )
+        if removed_at is not None and removed_at > since:
+            since = None
+        interactions["full"] = since is None
+
+    for key, model in (
+        ("likes", models.ReviewLike),
+        ("dislikes", models.ReviewDislike),
+        ("reports", models.ReviewReport),
+    ):
+        queryset = model.objects.filter(customer=customer_id)
+        if review_ids is not None:
+            queryset = queryset.filter(review__in=list(review_ids))
+        if product_id is not None:
+            queryset = queryset.filter(review__product=product_id)
+        if since is not None:
+            queryset = queryset.filter(created_at__gt=since)
+
+        interactions[key] = list(queryset.values_list("review", flat=True))
+
+    return interactions
+
+
 def filter_products(products: BaseManager[models.Product], request: Request):
     category = request.query_params.get("category")
     brand = request.query_params.get("brand")
@@ -88,16 +318,34 @@ def filter_products(products: BaseManager[models.Product], request: Request):
     return products
 
 
-def is_best_seller(product: models.Product):
-    products = models.Product.objects.all()
+# Aliases to sort products by their statistics
+PRODUCT_ORDERINGS = {
+    "sold": "stats__order_lines",
+    "units_sold": "stats__sold_units",
+    "reviews": "stats__review_count",
+    "rating": "stats__rating_avg",
+}
+# Besides the aliases, products can only be sorted by their own columns,
+# never by related models
+PRODUCT_ORDERINGS.update(
+    (field.name, field.name)
+    for field in models.Product._meta.concrete_fields
+    if not field.is_relation
+)
 
-    best_sellers = (
-        models.OrderItem.objects.values("product")
-        .annotate(order_count=Count("id"), total_quantity=Sum("quantity"))
-        .order_by("-order_count")[:25]
-    )
 
-    bs_products = [item["product"] for item in best_sellers]
+def order_products(products: BaseManager[models.Product], request: Request):
+    order_by = request.query_params.get("order_by")
+    if not order_by:
+        return products
+
+    descending = order_by.startswith("-")
+    field = PRODUCT_ORDERINGS.get(order_by.lstrip("-"))
+    if field is None:
+        return products
 
-    products = products.filter(id__in=bs_products)
-    return products.filter(id=product.id).exists()
+    return products.order_by(f"-{field}" if descending else field)
+
+
+def is_best_seller(product: models.Product):
+    return product.id in rankings.get_best_sellers()
@@ -1,7 +1,12 @@
 import re
+import csv
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext as _
-import pandas
 
 
 class RegexPasswordValidator:
@@ -21,17 +26,83 @@ class RegexPasswordValidator:
         )
 
 
-def profanity_filter(value):
-    bad_words_path = "api/datasets/bad_words.csv"
+BAD_WORDS_PATH = Path(__file__).resolve().parent / "datasets" / "bad_words.csv"
 
-    df = pandas.read_csv(bad_words_path)
 
-    input_text = str(value).lower()
+class ProfanityMatcher:
+    """
+    Aho-Corasick automaton that tells whether any of the given words appears
+    as a substring of a text, in a single pass over the text
+    """
 
-    for index, row in df.iterrows():
-        word = row["word"].lower()
+    def __init__(self, words: Iterable[str]):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.terminal = [False]
 
-        if word in input_text:
-            raise ValidationError(
-                _("Text was detected as inappropriate"), code="inappropriate_text"
-            )
+        for word in words:
+            state = 0
+            for char in word:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.terminal.append(False)
+                state = next_state
+            self.terminal[state] = True
+
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(char, 0)
+                self.terminal[next_state] |= self.terminal[self.fail[next_state]]
+                queue.append(next_state)
+
+    def search(self, text: str) -> bool:
+        transitions, fail, terminal = self.transitions, self.fail, self.terminal
+
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            if terminal[state]:
+                return True
+
+        return False
+
+
+@lru_cache(maxsize=None)
+def get_profanity_matcher(languages: frozenset = None) -> ProfanityMatcher:
+    """
+    Load the bad words (optionally only those of the given languages) once
+    per process and compile them into a matcher
+    """
+    with open(BAD_WORDS_PATH, encoding="utf-8", newline="") as file:
+        words = [
+            row["word"].lower()
+            for row in csv.DictReader(file)
+            if languages is None or row["language"] in languages
+        ]
+
+    return ProfanityMatcher(words)
+
+
+def contains_profanity(value, languages: Iterable[str] = None) -> bool:
+    languages = frozenset(languages) if languages is not None else None
+    return get_profanity_matcher(languages).search(str(value).lower())
+
+
+def profanity_filter(value):
+    languages = getattr(settings, "PROFANITY_FILTER_LANGUAGES", None)
+
+    if contains_profanity(value, languages):
+        raise ValidationError(
+            _("Text was detected as inappropriate"), code="inappropriate_text"
+        )
@@ -1,7 +1,10 @@
 # Django
-from django.db.models import Count, Q, Sum
+from django.db import transaction
+from django.db.models import Count, Sum
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 # REST Framework
 from rest_framework.response import Response
@@ -14,12 +17,20 @@ from rest_framework.request import Request
 # App
 from . import serializers
 from . import models
+from .mixins import CustomerMixin
 from . import utils
 from . import validators
-
-# Caching
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from . import moderation
+from . import pagination
+from . import quotas
+from . import caching
+from . import customer_items
+from . import search as product_search
+from . import votes
+from . import autocomplete
+from . import inventory
+from . import rankings
+from . import stats
 
 # Validation
 from django.contrib.auth.password_validation import validate_password
@@ -27,7 +38,7 @@ from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 
 # Other
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta
 
 
 @permission_classes([IsAuthenticated, IsAdminUser])
@@ -37,28 +48,62 @@ def routes(request: Request):
 
 
 class ProductViewSet(viewsets.ViewSet):
-    @method_decorator(cache_page(60 * 60))
+    @caching.cache_response(60 * 60 * 24 * 7, local_timeout=60 * 60)
     def list(self, request: Request):
         try:
             page = request.query_params.get("page")
             page = int(page) if str(page).isnumeric() else 1
 
-            products = models.Product.objects.all()
+            products = models.Product.objects.select_related(
+                "brand", "category", "stats"
+            )
             filtered_products = utils.filter_products(products, request)
 
+            if "cursor" in request.query_params:
+                page_products, next_cursor, previous_cursor = (
+                    pagination.paginate_by_cursor(
+                        filtered_products,
+                        request.query_params["cursor"],
+                        ordering=("offer_price", "id"),
+                        page_size=10,
+                    )
+                )
+
+                return caching.tagged(
+                    Response(
+                        {
+                            "products": utils.compose_products(page_products),
+                            "next": next_cursor,
+                            "previous": previous_cursor,
+                        },
+                        status=status.HTTP_200_OK,
+                    ),
+                    {"products", "best-sellers", *caching.product_tags(page_products)},
+                )
+
+            filtered_products = utils.order_products(filtered_products, request)
+
             paginator = Paginator(filtered_products, 10)
             page_queryset = paginator.get_page(page)
 
-            serialized_products_data = [utils.compose_product(p) for p in page_queryset]
+            serialized_products_data = utils.compose_products(page_queryset)
 
-            return Response(serialized_products_data, status=status.HTTP_200_OK)
+            return caching.tagged(
+                Response(serialized_products_data, status=status.HTTP_200_OK),
+                {"products", "best-sellers", *caching.product_tags(page_queryset)},
+            )
+
+        except pagination.InvalidCursor:
+            return Response(
+                {"message": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         except Exception as e:
             return Response(
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-    @method_decorator(cache_page(60 * 60))
+    @caching.cache_response(60 * 60 * 24 * 7, local_timeout=60 * 60)
     def retrieve(self, request: Request, product_id: int):
         try:
             product = models.Product.objects.get(id=product_id)
@@ -68,89 +113,148 @@ class ProductViewSet(viewsets.ViewSet):
                 status=404,
             )
 
-        return Response(
-            utils.compose_product(product),
-            status=200,
+        return caching.tagged(
+            Response(
+                utils.compose_product(product),
+                status=200,
+            ),
+            {"best-sellers", *caching.product_tags([product])},
         )
 
 
 class BrandViewSet(viewsets.ViewSet):
-    @method_decorator(cache_page(60 * 60 * 24))
+    @caching.cache_response(60 * 60 * 24 * 7, local_timeout=60 * 60 * 24)
     def list(self, request: Request):
         brands = models.Brand.objects.all()
         serialized_brands = serializers.BrandSerializer(brands, many=True)
 
-        return Response(serialized_brands.data, status=status.HTTP_200_OK)
+        return caching.tagged(
+            Response(serialized_brands.data, status=status.HTTP_200_OK), {"brands"}
+        )
 
 
 class CategoryViewSet(viewsets.ViewSet):
-    @method_decorator(cache_page(60 * 60 * 24))
+    @caching.cache_response(60 * 60 * 24 * 7, local_timeout=60 * 60 * 24)
     def list(self, request: Request):
         categories = models.Category.objects.all()
         serialized_categories = serializers.CategorySerializer(categories, many=True)
 
-        return Response(serialized_categories.data, status=status.HTTP_200_OK)
+        return caching.tagged(
+            Response(serialized_categories.data, status=status.HTTP_200_OK),
+            {"categories"},
+        )
 
 
 class SearchViewSet(viewsets.ViewSet):
-    @method_decorator(cache_page(60 * 60 * 1))
+    # Full searches are charged as several requests, suggestions as one
+    throttle_cost = {"list": 3}
+
+    def suggest(self, request: Request, prefix: str):
+        try:
+            suggestions = autocomplete.suggest(prefix)
+
+            return Response(suggestions, status=status.HTTP_200_OK)
+
+        except Exception:
+            return Response(
+                {"message": "Something went wrong."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    @caching.cache_response(60 * 60 * 24 * 7, local_timeout=60 * 60)
     def list(self, request: Request, search: str):
         try:
             page = request.query_params.get("page")
             page = int(page) if str(page).isnumeric() else 1
 
-            search_terms = str(search).split(",")
+            operator = request.query_params.get("operator", "or")
+            search_results = product_search.search_products(search, operator)
 
-            query = Q()
-            for term in search_terms:
-                query |= Q(name__icontains=term)
-                query |= Q(category__title__icontains=term)
-                query |= Q(brand__name__icontains=term)
-
-            products = models.Product.objects.all()
-            products = products.filter(query)
+            products = models.Product.objects.filter(
+                id__in=[product_id for product_id, score in search_results]
+            )
 
-            categories = set(p.category for p in products)
+            facets = utils.compose_facets(products)
             serialized_categories = serializers.CategorySerializer(
-                categories, many=True
+                facets["categories"], many=True
             )
-
-            brands = set(p.brand for p in products)
-            serialized_brands = serializers.BrandSerializer(brands, many=True)
-
-            installments = set(p.installments for p in products)
+            serialized_brands = serializers.BrandSerializer(facets["brands"], many=True)
 
             products = utils.filter_products(products, request)
-            results = len(products)
 
-            order_by_field = request.query_params.get("order_by")
-            if order_by_field:
-                products = products.order_by(order_by_field)
-
-            paginator = Paginator(products, 10)
-            page_queryset = paginator.get_page(page)
-
-            serialized_products_data = [utils.compose_product(p) for p in page_queryset]
+            if "cursor" in request.query_params:
+                page_queryset, next_cursor, previous_cursor = (
+                    pagination.paginate_by_cursor(
+                        products.select_related("brand", "category", "stats"),
+                        request.query_params["cursor"],
+                        ordering=("offer_price", "id"),
+                        page_size=10,
+                    )
+                )
+                page_data = {"next": next_cursor, "previous": previous_cursor}
+            elif request.query_params.get("order_by"):
+                products = utils.order_products(products, request)
 
-            return Response(
+                paginator = Paginator(
+                    products.select_related("brand", "category", "stats"), 10
+                )
+                page_queryset = paginator.get_page(page)
+                page_data = {"results": paginator.count, "pages": paginator.num_pages}
+            else:
+                # Sort by relevance, only the products of the page are loaded
+                filtered_ids = set(products.values_list("id", flat=True))
+                ranked_ids = [
+                    product_id
+                    for product_id, score in search_results
+                    if product_id in filtered_ids
+                ]
+
+                paginator = Paginator(ranked_ids, 10)
+                page_ids = paginator.get_page(page)
+
+                page_products = models.Product.objects.select_related(
+                    "brand", "category", "stats"
+                ).in_bulk(page_ids)
+                page_queryset = [page_products[product_id] for product_id in page_ids]
+                page_data = {"results": paginator.count, "pages": paginator.num_pages}
+
+            serialized_products_data = utils.compose_products(page_queryset)
+
+            response = Response(
                 {
-                    "results": results,
-                    "pages": paginator.num_pages,
+                    **page_data,
                     "products": serialized_products_data,
                     "categories": serialized_categories.data,
                     "brands": serialized_brands.data,
-                    "installments": installments,
+                    "installments": set(facets["installments"]),
+                    "facets": {
+                        "categories": {c.id: c.hits for c in facets["categories"]},
+                        "brands": {b.id: b.hits for b in facets["brands"]},
+                        "installments": facets["installments"],
+                    },
                 },
                 status=status.HTTP_200_OK,
             )
 
+            return caching.tagged(
+                response,
+                {"products", "best-sellers", *caching.product_tags(page_queryset)},
+            )
+
+        except pagination.InvalidCursor:
+            return Response(
+                {"message": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
         except Exception as e:
             return Response(
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
             )
 
 
-class CustomerViewSet(viewsets.ViewSet):
+class CustomerViewSet(CustomerMixin, viewsets.ViewSet):
+    stateless_actions = ("list", "interactions")
+
     def get_permissions(self):
         if self.action == "create":
             permission_classes = [AllowAny]
@@ -158,15 +262,18 @@ class CustomerViewSet(viewsets.ViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-    @method_decorator(cache_page(60))
+    @caching.cache_response(60 * 60 * 24, per_user=True)
     def retrieve(self, request: Request):
         try:
             user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             serialized_customer_data = utils.compose_customer(customer)
 
-            return Response(serialized_customer_data, status=status.HTTP_200_OK)
+            return caching.tagged(
+                Response(serialized_customer_data, status=status.HTTP_200_OK),
+                {f"customer:user:{user.pk}"},
+            )
 
         except Exception as e:
             return Response(
@@ -180,18 +287,6 @@ class CustomerViewSet(viewsets.ViewSet):
             password = request.data["password"]
             birthdate = request.data["birthdate"]
 
-            # Given my database limitations, i need to control the database size :3
-            customers_created_today = models.User.objects.filter(
-                date_joined=date.today()
-            ).count()
-            if customers_created_today >= 50:
-                return Response(
-                    {
-                        "message": "The app has reached its daily account creation limit."
-                    },
-                    status=status.HTTP_429_TOO_MANY_REQUESTS,
-                )
-
             if len(username) < 8:
                 return Response(
                     {"message": "Username is too short."},
@@ -237,15 +332,21 @@ class CustomerViewSet(viewsets.ViewSet):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
-            new_user = models.User.objects.create_user(
-                username=username, email=email, password=password
-            )
-            new_customer = models.Customer.objects.create(
-                birthdate=birthdate, user=new_user
-            )
+            # Given my database limitations, i need to control the database size :3
+            daily_accounts = quotas.daily_accounts()
+            if not daily_accounts.acquire():
+                return Response(
+                    {
+                        "message": "The app has reached its daily account creation limit."
+                    },
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                )
 
-            new_user.save()
-            new_customer.save()
+            with quotas.held(daily_accounts), transaction.atomic():
+                new_user = models.User.objects.create_user(
+                    username=username, email=email, password=password
+                )
+                models.Customer.objects.create(birthdate=birthdate, user=new_user)
 
             return Response(
                 {"message": "Account created successfully."},
@@ -260,7 +361,7 @@ class CustomerViewSet(viewsets.ViewSet):
     def update(self, request: Request):
         try:
             user: models.User = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             new_username = request.data.get("username")
             new_email = request.data.get("email")
@@ -379,7 +480,7 @@ class CustomerViewSet(viewsets.ViewSet):
     def delete(self, request: Request):
         try:
             user: models.User = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             password = request.data["password"]
 
@@ -403,24 +504,40 @@ class CustomerViewSet(viewsets.ViewSet):
 
     def list(self, request: Request):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
-
-            likes = [
-                like.review.id
-                for like in models.ReviewLike.objects.filter(customer=customer)
-            ]
-            dislikes = [
-                dislike.review.id
-                for dislike in models.ReviewDislike.objects.filter(customer=customer)
-            ]
-            reports = [
-                report.review.id
-                for report in models.ReviewReport.objects.filter(customer=customer)
-            ]
+            customer_id = self.get_customer_id(request)
+
+            serialized_interactions_data = utils.compose_interactions(customer_id)
+
+            return Response(serialized_interactions_data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+    def interactions(
+        self, request: Request, product_id: int = None, review_ids: "list[int]" = None
+    ):
+        try:
+            customer_id = self.get_customer_id(request)
+
+            since = request.query_params.get("since")
+            if since is not None:
+                since = parse_datetime(since)
+                if since is None:
+                    return Response(
+                        {"message": "Invalid since date."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
+
+            timestamp = timezone.now()
+            serialized_interactions_data = utils.compose_interactions(
+                customer_id, review_ids=review_ids, product_id=product_id, since=since
+            )
 
             return Response(
-                {"likes": likes, "dislikes": dislikes, "reports": reports},
+                {**serialized_interactions_data, "timestamp": timestamp},
                 status=status.HTTP_200_OK,
             )
         except Exception as e:
@@ -438,46 +555,66 @@ class CustomerViewSet(viewsets.ViewSet):
         return age
 
 
-class CartItemViewSet(viewsets.ViewSet):
+class CartItemViewSet(CustomerMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    stateless_actions = ("list", "summary")
 
     def list(self, request: Request):
-        user = request.user
+        customer_id = self.get_customer_id(request)
 
-        cart_items = models.CartItem.objects.filter(customer__user=user)
-        serialized_products_data = [
-            utils.compose_product(cart_item.product) for cart_item in cart_items
-        ]
+        cart_items = models.CartItem.objects.filter(
+            customer=customer_id
+        ).select_related("product__brand", "product__category", "product__stats")
+        serialized_products_data = utils.compose_products(
+            cart_item.product for cart_item in cart_items
+        )
 
         return Response(serialized_products_data, status=status.HTTP_200_OK)
 
-    def create(self, request: Request, product_id: int):
+    def summary(self, request: Request):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer_id = self.get_customer_id(request)
 
-            current_cart_items = models.CartItem.objects.filter(
-                customer=customer
-            ).count()
-            if current_cart_items >= 10:
-                return Response(
-                    {"message": "You cannot add more than 10 products to your cart."},
-                    status=status.HTTP_403_FORBIDDEN,
+            cart_lines = list(
+                models.CartItem.objects.filter(customer=customer_id)
+                .order_by("id")
+                .values(
+                    "product", "product__name", "product__price", "product__offer_price"
                 )
+            )
+            coupons = models.Coupon.objects.filter(customer=customer_id)
 
-            product = models.Product.objects.get(id=product_id)
+            serialized_summary_data = utils.compose_cart_summary(cart_lines, coupons)
 
-            new_cart_item = models.CartItem.objects.create(
-                product=product, customer=customer
+            return Response(serialized_summary_data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-            new_cart_item.save()
+    def create(self, request: Request, product_ids: "list[int]"):
+        try:
+            customer = self.get_customer(request)
+
+            customer_items.add_items(
+                models.CartItem,
+                customer,
+                product_ids,
+                limit=customer_items.CART_ITEMS_LIMIT,
+            )
 
             return Response(
-                {"message": "The product was added to your cart."},
+                {"message": "The products were added to your cart."},
                 status=status.HTTP_200_OK,
             )
 
+        except customer_items.LimitExceeded:
+            return Response(
+                {"message": "You cannot add more than 10 products to your cart."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         except Exception as e:
             return Response(
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
@@ -485,10 +622,8 @@ class CartItemViewSet(viewsets.ViewSet):
 
     def delete(self, request: Request, product_id: int):
         try:
-            user = request.user
-
             product = models.Product.objects.get(id=product_id)
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             new_cart_item = models.CartItem.objects.get(
                 product=product, customer=customer
@@ -506,37 +641,27 @@ class CartItemViewSet(viewsets.ViewSet):
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-    def update(self, request: Request, product_id: int):
+    def update(self, request: Request, product_ids: "list[int]"):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
-
-            current_fav_items = models.FavItem.objects.filter(customer=customer).count()
-            if current_fav_items >= 25:
-                return Response(
-                    {
-                        "message": "You cannot add more than 25 products to your favorites."
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            product = models.Product.objects.get(id=product_id)
-
-            new_fav_item = models.FavItem.objects.create(
-                product=product, customer=customer
+            customer = self.get_customer(request)
+
+            customer_items.add_items(
+                models.FavItem,
+                customer,
+                product_ids,
+                limit=customer_items.FAV_ITEMS_LIMIT,
+                source_model=models.CartItem,
             )
 
-            new_fav_item.save()
-
-            prev_cart_item = models.CartItem.objects.get(
-                product=product, customer=customer
+            return Response(
+                {"message": "The products were moved to your favorites."},
+                status=status.HTTP_200_OK,
             )
 
-            prev_cart_item.delete()
-
+        except customer_items.LimitExceeded:
             return Response(
-                {"message": "The product was moved to your favorites."},
-                status=status.HTTP_200_OK,
+                {"message": "You cannot add more than 25 products to your favorites."},
+                status=status.HTTP_403_FORBIDDEN,
             )
 
         except Exception as e:
@@ -545,47 +670,44 @@ class CartItemViewSet(viewsets.ViewSet):
             )
 
 
-class FavItemViewSet(viewsets.ViewSet):
+class FavItemViewSet(CustomerMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    stateless_actions = ("list",)
 
     def list(self, request: Request):
-        user = request.user
-        customer = models.Customer.objects.get(user=user)
+        customer_id = self.get_customer_id(request)
 
-        fav_items = models.FavItem.objects.filter(customer=customer)
-        serialized_products_data = [
-            utils.compose_product(fav_item.product) for fav_item in fav_items
-        ]
+        fav_items = models.FavItem.objects.filter(customer=customer_id).select_related(
+            "product__brand", "product__category", "product__stats"
+        )
+        serialized_products_data = utils.compose_products(
+            fav_item.product for fav_item in fav_items
+        )
 
         return Response(serialized_products_data, status=status.HTTP_200_OK)
 
-    def create(self, request: Request, product_id: int):
+    def create(self, request: Request, product_ids: "list[int]"):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
-
-            current_fav_items = models.FavItem.objects.filter(customer=customer).count()
-            if current_fav_items >= 25:
-                return Response(
-                    {
-                        "message": "You cannot add more than 25 products to your favorites."
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            product = models.Product.objects.get(id=product_id)
+            customer = self.get_customer(request)
 
-            new_fav_item = models.FavItem.objects.create(
-                product=product, customer=customer
+            customer_items.add_items(
+                models.FavItem,
+                customer,
+                product_ids,
+                limit=customer_items.FAV_ITEMS_LIMIT,
             )
 
-            new_fav_item.save()
-
             return Response(
-                {"message": "The product was added to your favorites."},
+                {"message": "The products were added to your favorites."},
                 status=status.HTTP_200_OK,
             )
 
+        except customer_items.LimitExceeded:
+            return Response(
+                {"message": "You cannot add more than 25 products to your favorites."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         except Exception as e:
             return Response(
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
@@ -593,10 +715,8 @@ class FavItemViewSet(viewsets.ViewSet):
 
     def delete(self, request: Request, product_ids=None):
         try:
-            user = request.user
-
             products = models.Product.objects.filter(id__in=product_ids)
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             fav_items = models.FavItem.objects.filter(
                 product__in=products, customer=customer
@@ -614,38 +734,27 @@ class FavItemViewSet(viewsets.ViewSet):
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-    def update(self, request: Request, product_id: int):
+    def update(self, request: Request, product_ids: "list[int]"):
         try:
-            user = request.user
-
-            customer = models.Customer.objects.get(user=user)
-
-            current_cart_items = models.CartItem.objects.filter(
-                customer=customer
-            ).count()
-            if current_cart_items >= 10:
-                return Response(
-                    {"message": "You cannot add more than 10 products to your cart."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            product = models.Product.objects.get(id=product_id)
-
-            new_cart_item = models.CartItem.objects.create(
-                product=product, customer=customer
+            customer = self.get_customer(request)
+
+            customer_items.add_items(
+                models.CartItem,
+                customer,
+                product_ids,
+                limit=customer_items.CART_ITEMS_LIMIT,
+                source_model=models.FavItem,
             )
 
-            new_cart_item.save()
-
-            prev_fav_item = models.FavItem.objects.get(
-                product=product, customer=customer
+            return Response(
+                {"message": "The products were moved to your cart."},
+                status=status.HTTP_200_OK,
             )
 
-            prev_fav_item.delete()
-
+        except customer_items.LimitExceeded:
             return Response(
-                {"message": "The product was moved to your cart"},
-                status=status.HTTP_200_OK,
+                {"message": "You cannot add more than 10 products to your cart."},
+                status=status.HTTP_403_FORBIDDEN,
             )
 
         except Exception as e:
@@ -654,22 +763,12 @@ class FavItemViewSet(viewsets.ViewSet):
             )
 
 
-class PurchaseViewSet(viewsets.ViewSet):
+class PurchaseViewSet(CustomerMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def create(self, request: Request):
         try:
-            user: models.User = request.user
-            customer = models.Customer.objects.get(user=user)
-
-            current_active_orders = models.Order.objects.filter(
-                customer=customer, delivered=False
-            ).count()
-            if current_active_orders >= 3:
-                return Response(
-                    {"message": "You cannot have more than 3 active orders."},
-                    status=403,
-                )
+            customer = self.get_customer(request)
 
             products = request.data["products"]
             payment_method = request.data["payment_method"]
@@ -679,11 +778,17 @@ class PurchaseViewSet(viewsets.ViewSet):
             notes = request.data["notes"]
             coupon_id = request.data.get("coupon")
 
+            active_orders = quotas.active_orders(customer.pk)
+            if not active_orders.acquire():
+                return Response(
+                    {"message": "You cannot have more than 3 active orders."},
+                    status=403,
+                )
+
             # Given my database limitations, i need to control the database size :3
-            orders_created_today = models.Order.objects.filter(
-                purchase_date=date.today()
-            ).count()
-            if orders_created_today >= 100:
+            daily_orders = quotas.daily_orders()
+            if not daily_orders.acquire():
+                active_orders.release()
                 return Response(
                     {"message": "The app has reached its daily order creation limit."},
                     status=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -693,51 +798,75 @@ class PurchaseViewSet(viewsets.ViewSet):
             delivery_term = current_date + timedelta(days=3)
             delivery_term_str = delivery_term.strftime("%Y-%m-%d")
 
-            order = models.Order.objects.create(
-                paid=0,
-                payment_method=payment_method,
-                delivery_term=delivery_term_str,
-                country=country,
-                city=city,
-                address=address,
-                notes=notes,
-                customer=customer,
-            )
-
-            order_items = [
-                models.OrderItem.objects.create(
-                    quantity=int(product["quantity"]),
-                    product=models.Product.objects.get(id=int(product["id"])),
-                    order=order,
+            with quotas.held(active_orders, daily_orders), transaction.atomic():
+                product_objs = models.Product.objects.in_bulk(
+                    [int(product["id"]) for product in products]
                 )
-                for product in products
-            ]
+                order_items = [
+                    models.OrderItem(
+                        quantity=int(product["quantity"]),
+                        product=product_objs[int(product["id"])],
+                    )
+                    for product in products
+                ]
+                for item in order_items:
+                    item.total_cost = item.product.offer_price * item.quantity
 
-            total = sum(
-                [item.product.offer_price * item.quantity for item in order_items]
-            )
+                inventory.reserve_stock(order_items)
 
-            coupon = None
-            if coupon_id:
-                if str(coupon_id).isdigit():
+                coupon = None
+                if coupon_id and str(coupon_id).isdigit():
                     coupon = models.Coupon.objects.get(
                         id=int(coupon_id), customer=customer
                     )
-                    total = total - coupon.amount
 
-            if len(products) > 1:
-                cart_discount = total * len(order_items) / 100
-                total = total - cart_discount
+                order = models.Order.objects.create(
+                    paid=utils.compute_total(
+                        sum(item.total_cost for item in order_items),
+                        len(order_items),
+                        coupon,
+                    ),
+                    payment_method=payment_method,
+                    delivery_term=delivery_term_str,
+                    country=country,
+                    city=city,
+                    address=address,
+                    notes=notes,
+                    customer=customer,
+                )
 
-            order.paid = total
+                for item in order_items:
+                    item.order = order
+                models.OrderItem.objects.bulk_create(order_items)
 
-            order.save()
-            [item.save() for item in order_items]
-            if coupon:
-                coupon.delete()
+                if coupon:
+                    coupon.delete()
+
+                # Bulk creation skips the order item signals
+                stats.record_order_items(order_items)
+                transaction.on_commit(rankings.refresh_best_sellers)
+                caching.invalidate_tags(
+                    *[f"product:{product_id}" for product_id in product_objs]
+                )
+
+            return Response(
+                {
+                    "message": "Order created successfully.",
+                    "order": serializers.OrderSerializer(order).data,
+                    "order_items": serializers.OrderItemSerializer(
+                        order_items, many=True
+                    ).data,
+                },
+                status=status.HTTP_200_OK,
+            )
 
+        except inventory.OutOfStock as e:
             return Response(
-                {"message": "Order created successfully."}, status=status.HTTP_200_OK
+                {
+                    "message": "Some products do not have enough stock.",
+                    "products": e.product_ids,
+                },
+                status=status.HTTP_409_CONFLICT,
             )
 
         except Exception as e:
@@ -747,22 +876,30 @@ class PurchaseViewSet(viewsets.ViewSet):
 
     def list(self, request: Request):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
-            order = models.Order.objects.filter(customer=customer)
-            if not order.exists():
-                return Response([], status=status.HTTP_200_OK)
-            else:
-                order = order[0]
+            page = request.query_params.get("page")
+            page = int(page) if str(page).isnumeric() else 1
 
-            order_items = models.OrderItem.objects.filter(order=order)
+            orders = (
+                models.Order.objects.filter(customer=customer)
+                .select_related("customer__user", "delivery_man__user")
+                .order_by("-purchase_date", "-id")
+            )
 
-            serialized_purchases_data = [
-                utils.compose_purchase(order_item) for order_item in order_items
-            ]
+            paginator = Paginator(orders, 10)
+            orders_page = paginator.get_page(page)
 
-            return Response(serialized_purchases_data, status=status.HTTP_200_OK)
+            serialized_history_data = utils.compose_history(orders_page)
+
+            return Response(
+                {
+                    "results": paginator.count,
+                    "pages": paginator.num_pages,
+                    "orders": serialized_history_data,
+                },
+                status=status.HTTP_200_OK,
+            )
 
         except Exception as e:
             return Response(
@@ -771,9 +908,7 @@ class PurchaseViewSet(viewsets.ViewSet):
 
     def retrieve(self, request: Request, order_item_id: int):
         try:
-            user = request.user
-
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
             orders = models.Order.objects.filter(customer=customer)
             if not orders.exists():
                 return Response(
@@ -808,8 +943,7 @@ class PurchaseViewSet(viewsets.ViewSet):
 
     def update(self, request: Request, order_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             order = models.Order.objects.filter(id=order_id, customer=customer)
             if not order.exists():
@@ -853,13 +987,12 @@ class PurchaseViewSet(viewsets.ViewSet):
 
     def delete(self, request: Request, order_id: int):
         try:
-            user: models.User = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
 
             order = models.Order.objects.get(id=order_id, customer=customer)
-            order_items = models.OrderItem.objects.filter(order=order)
+            order_items = list(models.OrderItem.objects.filter(order=order))
 
-            if not order_items.exists():
+            if not order_items:
                 return Response(
                     "Something went wrong.", status=status.HTTP_400_BAD_REQUEST
                 )
@@ -870,8 +1003,13 @@ class PurchaseViewSet(viewsets.ViewSet):
                     403,
                 )
 
-            order.delete()
-            order_items.delete()
+            # The items must go first, deleting the order unlinks them
+            with transaction.atomic():
+                inventory.release_stock(order_items)
+                models.OrderItem.objects.filter(
+                    id__in=[item.id for item in order_items]
+                ).delete()
+                order.delete()
 
             return Response(
                 {"message": "Order successfully canceled."}, status=status.HTTP_200_OK
@@ -881,7 +1019,9 @@ class PurchaseViewSet(viewsets.ViewSet):
             return Response("Something went wrong.", status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ViewSet):
+class ReviewViewSet(CustomerMixin, viewsets.ViewSet):
+    stateless_actions = ("like", "dislike")
+
     def get_permissions(self):
         if self.action == "list":
             permission_classes = [AllowAny]
@@ -889,17 +1029,56 @@ class ReviewViewSet(viewsets.ViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-    @method_decorator(cache_page(60 * 60))
+    @caching.cache_response(60 * 60 * 24 * 7, local_timeout=60 * 60)
     def list(self, request: Request, product_id: int):
         try:
             product = models.Product.objects.get(id=product_id)
-            reviews = models.Review.objects.filter(product=product, hidden=False)
+            reviews = models.Review.objects.filter(
+                product=product, hidden=False
+            ).select_related("customer__user", "product")
+
+            if "cursor" in request.query_params:
+                page_size = request.query_params.get("page_size")
+                page_size = int(page_size) if str(page_size).isnumeric() else 10
+
+                page_reviews, next_cursor, previous_cursor = (
+                    pagination.paginate_by_cursor(
+                        reviews,
+                        request.query_params["cursor"],
+                        ordering=("-date", "-id"),
+                        page_size=min(max(page_size, 1), 50),
+                    )
+                )
 
-            serialized_reviews_data = [
-                utils.compose_review(review) for review in reviews
-            ]
+                return caching.tagged(
+                    Response(
+                        {
+                            "reviews": utils.compose_reviews(page_reviews),
+                            "next": next_cursor,
+                            "previous": previous_cursor,
+                        },
+                        status=status.HTTP_200_OK,
+                    ),
+                    {
+                        f"reviews:product:{product.id}",
+                        *(f"review:{review.id}" for review in page_reviews),
+                    },
+                )
 
-            return Response(serialized_reviews_data, status=status.HTTP_200_OK)
+            serialized_reviews_data = utils.compose_reviews(reviews)
+
+            return caching.tagged(
+                Response(serialized_reviews_data, status=status.HTTP_200_OK),
+                {
+                    f"reviews:product:{product.id}",
+                    *(f"review:{review.id}" for review in reviews),
+                },
+            )
+
+        except pagination.InvalidCursor:
+            return Response(
+                {"message": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         except Exception as e:
             return Response(
@@ -908,23 +1087,12 @@ class ReviewViewSet(viewsets.ViewSet):
 
     def create(self, request: Request, product_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
             product = models.Product.objects.get(id=product_id)
 
             rating = request.data["rating"]
             content = request.data["content"]
 
-            # Given my database limitations, i need to control the database size :3
-            reviews_created_today = models.Review.objects.filter(
-                date=date.today()
-            ).count()
-            if reviews_created_today >= 100:
-                return Response(
-                    {"message": "The app has reached its daily review creation limit."},
-                    status=status.HTTP_429_TOO_MANY_REQUESTS,
-                )
-
             try:
                 validators.profanity_filter(content)
             except ValidationError as e:
@@ -933,14 +1101,21 @@ class ReviewViewSet(viewsets.ViewSet):
                     status=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 )
 
-            new_review = models.Review.objects.create(
-                customer=customer,
-                product=product,
-                rating=rating,
-                content=content,
-            )
+            # Given my database limitations, i need to control the database size :3
+            daily_reviews = quotas.daily_reviews()
+            if not daily_reviews.acquire():
+                return Response(
+                    {"message": "The app has reached its daily review creation limit."},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                )
 
-            new_review.save()
+            with quotas.held(daily_reviews):
+                models.Review.objects.create(
+                    customer=customer,
+                    product=product,
+                    rating=rating,
+                    content=content,
+                )
 
             return Response(
                 {"message": "Review created successfully."}, status=status.HTTP_200_OK
@@ -953,8 +1128,7 @@ class ReviewViewSet(viewsets.ViewSet):
 
     def update(self, request: Request, product_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
             product = models.Product.objects.get(id=product_id)
 
             review = models.Review.objects.get(customer=customer, product=product)
@@ -988,8 +1162,7 @@ class ReviewViewSet(viewsets.ViewSet):
 
     def delete(self, request: Request, product_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer = self.get_customer(request)
             product = models.Product.objects.get(id=product_id)
 
             review = models.Review.objects.get(customer=customer, product=product)
@@ -1006,27 +1179,13 @@ class ReviewViewSet(viewsets.ViewSet):
 
     def like(self, request: Request, review_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
-            review = models.Review.objects.get(id=review_id)
+            customer_id = self.get_customer_id(request)
 
-            existing_like = models.ReviewLike.objects.filter(
-                review=review, customer=customer
-            )
-            if existing_like.exists():
-                existing_like[0].delete()
+            if not votes.toggle_vote(models.ReviewLike, review_id, customer_id):
                 return Response(
                     {"message": "Like successfully removed."}, status=status.HTTP_200_OK
                 )
 
-            existing_dislike = models.ReviewDislike.objects.filter(
-                review=review, customer=customer
-            )
-            if existing_dislike.exists():
-                existing_dislike[0].delete()
-
-            models.ReviewLike.objects.create(review=review, customer=customer).save()
-
             return Response({"message": "Liked."}, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -1036,28 +1195,14 @@ class ReviewViewSet(viewsets.ViewSet):
 
     def dislike(self, request: Request, review_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
-            review = models.Review.objects.get(id=review_id)
+            customer_id = self.get_customer_id(request)
 
-            existing_dislike = models.ReviewDislike.objects.filter(
-                review=review, customer=customer
-            )
-            if existing_dislike.exists():
-                existing_dislike[0].delete()
+            if not votes.toggle_vote(models.ReviewDislike, review_id, customer_id):
                 return Response(
                     {"message": "Dislike successfully removed."},
                     status=status.HTTP_200_OK,
                 )
 
-            existing_like = models.ReviewLike.objects.filter(
-                review=review, customer=customer
-            )
-            if existing_like.exists():
-                existing_like[0].delete()
-
-            models.ReviewDislike.objects.create(review=review, customer=customer).save()
-
             return Response({"message": "Disliked."}, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -1067,19 +1212,15 @@ class ReviewViewSet(viewsets.ViewSet):
 
     def report(self, request: Request, review_id: int):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
-            review = models.Review.objects.get(id=review_id)
+            customer = self.get_customer(request)
 
-            if models.ReviewReport.objects.filter(
-                review=review, customer=customer
-            ).exists():
+            try:
+                moderation.report_review(review_id, customer.pk)
+            except moderation.AlreadyReported:
                 return Response(
                     {"message": "Already reported."}, status=status.HTTP_403_FORBIDDEN
                 )
 
-            models.ReviewReport.objects.create(review=review, customer=customer).save()
-
             return Response({"message": "Reported."}, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -1088,19 +1229,22 @@ class ReviewViewSet(viewsets.ViewSet):
             )
 
 
-class CouponViewSet(viewsets.ViewSet):
+class CouponViewSet(CustomerMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    stateless_actions = ("list",)
 
-    @method_decorator(cache_page(60))
+    @caching.cache_response(60 * 60 * 24, per_user=True)
     def list(self, request: Request):
         try:
-            user = request.user
-            customer = models.Customer.objects.get(user=user)
+            customer_id = self.get_customer_id(request)
 
-            coupons = models.Coupon.objects.filter(customer=customer)
+            coupons = models.Coupon.objects.filter(customer=customer_id)
             serialized_coupons = serializers.CouponSerializer(coupons, many=True)
 
-            return Response(serialized_coupons.data, status=status.HTTP_200_OK)
+            return caching.tagged(
+                Response(serialized_coupons.data, status=status.HTTP_200_OK),
+                {f"coupons:customer:{customer_id}"},
+            )
         except Exception as e:
             return Response(
                 {"message": "Something went wrong."}, status=status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,146 @@
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from typing import Iterable
+
+from . import caching
+from . import models
+
+# Counter column of each vote model and the vote it replaces
+VOTES = {
+    models.ReviewLike: ("likes_count", models.ReviewDislike),
+    models.ReviewDislike: ("dislikes_count", models.ReviewLike),
+}
+
+
+def toggle_vote(vote_model, review_id: int, customer_id: int) -> bool:
+    """
+    Remove the vote of the customer if it exists, otherwise add it replacing
+    the opposite one, and return whether the vote was added
+
+    The counters are moved by the rows actually deleted and inserted, so
+    concurrent toggles cannot skew them
+    """
+    counter, opposite_model = VOTES[vote_model]
+    opposite_counter = VOTES[opposite_model][0]
+
+    # Raises Review.DoesNotExist for unknown reviews
+    voted, opposed = (
+        models.Review.objects.filter(id=review_id)
+        .annotate(
+            voted=Exists(
+                vote_model.objects.filter(review=OuterRef("pk"), customer=customer_id)
+            ),
+            opposed=Exists(
+                opposite_model.objects.filter(
+                    review=OuterRef("pk"), customer=customer_id
+                )
+            ),
+        )
+        .values_list("voted", "opposed")
+        .get()
+    )
+
+    with transaction.atomic():
+        if voted:
+            removed, _ = vote_model.objects.filter(
+                review=review_id, customer=customer_id
+            ).delete()
+            models.Review.objects.filter(id=review_id).update(
+                **{counter: F(counter) - removed}
+            )
+            mark_interactions_removed(customer_id)
+        else:
+            replaced = 0
+            if opposed:
+                replaced, _ = opposite_model.objects.filter(
+                    review=review_id, customer=customer_id
+                ).delete()
+            vote_model.objects.create(review_id=review_id, customer_id=customer_id)
+            models.Review.objects.filter(id=review_id).update(
+                **{
+                    counter: F(counter) + 1,
+                    opposite_counter: F(opposite_counter) - replaced,
+                }
+            )
+            if replaced:
+                mark_interactions_removed(customer_id)
+
+    caching.invalidate_tags(f"review:{review_id}")
+
+    return not voted
+
+
+def remove_customer_votes(customer_id: int):
+    """
+    Discount the votes of a customer from the counters of the reviews, with
+    one update per vote kind, before the votes are deleted along with them
+    """
+    for vote_model, (counter, _) in VOTES.items():
+        review_ids = list(
+            vote_model.objects.filter(customer=customer_id).values_list(
+                "review", flat=True
+            )
+        )
+        if not review_ids:
+            continue
+
+        models.Review.objects.filter(id__in=review_ids).update(
+            **{counter: F(counter) - 1}
+        )
+        caching.invalidate_tags(*[f"review:{review_id}" for review_id in review_ids])
+
+
+def mark_interactions_removed(customer_id: int):
+    # Stamped after the commit, so it is later than the timestamp of any
+    # interactions listing that could still see the removed vote
+    transaction.on_commit(
+        lambda: models.Customer.objects.filter(id=customer_id).update(
+            interactions_removed_at=timezone.now()
+        )
+    )
+
+
+def count_votes(vote_model) -> Coalesce:
+    votes = (
+        vote_model.objects.filter(review=OuterRef("pk"))
+        .order_by()
+        .values("review")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+
+    return Coalesce(Subquery(votes), 0)
+
+
+def reconcile_vote_counters(review_ids: Iterable[int] = None) -> list[int]:
+    """
+    Recount the votes and reports of the given reviews (all of them by
+    default), fixing the counters that drifted, and return the IDs of the fixed reviews
+    """
+    reviews = models.Review.objects.all()
+    if review_ids is not None:
+        reviews = reviews.filter(id__in=list(review_ids))
+
+    drifted = reviews.annotate(
+        likes=count_votes(models.ReviewLike),
+        dislikes=count_votes(models.ReviewDislike),
+        reports=count_votes(models.ReviewReport),
+    ).filter(
+        ~Q(likes_count=F("likes"))
+        | ~Q(dislikes_count=F("dislikes"))
+        | ~Q(reports_count=F("reports"))
+    )
+
+    with transaction.atomic():
+        drifted_ids = list(drifted.select_for_update().values_list("id", flat=True))
+        models.Review.objects.filter(id__in=drifted_ids).update(
+            likes_count=count_votes(models.ReviewLike),
+            dislikes_count=count_votes(models.ReviewDislike),
+            reports_count=count_votes(models.ReviewReport),
+        )
+
+    caching.invalidate_tags(*[f"review:{review_id}" for review_id in drifted_ids])
+
+    return drifted_ids
@@ -101,6 +101,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Cached responses, quotas, throttles and the token blacklist are shared by
+# the workers through the cache, production must use a shared backend
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+        if os.environ.get("REDIS_URL")
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -124,6 +141,13 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Languages of the bad words dataset used by the profanity filter, None means all
+PROFANITY_FILTER_LANGUAGES = None
+
+# Reviews are hidden once they receive this number of reports
+REVIEW_REPORT_THRESHOLD = 5
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -154,14 +178,16 @@ REST_FRAMEWORK = {
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CustomerJWTAuthentication",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "api.throttles.AnonSustainedRateThrottle",
-        "api.throttles.UserSustainedRateThrottle",
+        "api.throttles.AnonTieredRateThrottle",
+        "api.throttles.UserTieredRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
+        "anon-burst": "120/min",
         "anon-sustained": "3600/day",
+        "user-burst": "240/min",
         "user-sustained": "7200/day",
     },
 }
@@ -191,10 +217,10 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_EXP_CLAIM": "refresh_exp",
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "api.tokens.CustomerTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "api.tokens.CustomerTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
-    "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "api.tokens.CustomerTokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }